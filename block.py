@@ -8,6 +8,7 @@ import pprint
 from mathutils import Vector
 from os import path
 
+from Mineblend import blockregistry
 from Mineblend.sysutil import MCPATH
 from Mineblend.blocks import resourcepacks
 
@@ -129,12 +130,14 @@ class Block():
     def find_name(self, dvs):
         dv1, dv2 = dvs
         # print(dv1, dv2)
-        for block in self.defs:
-            if block["type"] == dv1:
-                if block["meta"] == dv2:
-                    self.name = block["name"]
-                    self.name_ = self.name.replace(" ", "_").lower()
-                    self.blockstate = block["blockstate"]
+        if not 0 <= dv1 < blockregistry.BLOCK_ID_LIMIT:
+            return
+        i = blockregistry.definitionIndex(dv1, dv2)  # (the same ids.json, so the same order as defs)
+        if i >= 0:
+            block = self.defs[i]
+            self.name = block["name"]
+            self.name_ = self.name.replace(" ", "_").lower()
+            self.blockstate = block["blockstate"]
 
     def to_path(self, pointer):
         """Converts a path name or tag to the name"""
@@ -322,10 +325,17 @@ class Material():
 
     """Not yet implimented I'm not sure if its necessary."""
 
+    GROUP_NAME = "mcClusterDiffuse"
+
     def __init__(self):
 
+        # one node group for every material, however many clusters (and tiles: see mineregion.meshTiles) there are
+        self.group = bpy.data.node_groups.get(Material.GROUP_NAME)
+        if self.group is not None:
+            return
+
         self.group = bpy.data.node_groups.new(
-            type="ShaderNodeTree", name="diffuse")
+            type="ShaderNodeTree", name=Material.GROUP_NAME)
 
         self.group.inputs.new("NodeSocketColor", "Image")
         self.group.inputs.new("NodeSocketColor", "Alpha")
@@ -402,7 +412,8 @@ class BlockCluster(Block):
 
     def sides(self, blocks, location):
         """Return a list of tuples; Block ID and data.
-            [up, down, north, south, east, west]"""
+            [up, down, north, south, east, west]
+        blocks is a worldvolume.WorldVolume, location x, world y, z."""
 
         BC = BlockCluster
 
@@ -416,47 +427,61 @@ class BlockCluster(Block):
         }
 
         x, y, z = location
+        ids = blocks.ids  # (indexed directly: row is y's row in the volume, which needn't start at height 0)
+        row = y - blocks.yOrigin
 
-        block_id = blocks[0][x][y][z]
+        block_id = ids[x, row, z]
 
         if y != self.yMax:
-            if blocks[0][x][y + 1][z] != block_id:  # up
+            if ids[x, row + 1, z] != block_id:  # up
                 faces["up"] = True
 
         if y != 0:
-            if blocks[0][x][y - 1][z] != block_id:  # down
+            if ids[x, row - 1, z] != block_id:  # down
                 faces["down"] = True
 
         if z != 0:
-            if blocks[0][x][y][z - 1] != block_id:  # north
+            if ids[x, row, z - 1] != block_id:  # north
                 faces["north"] = True
 
         if z != self.zMax:
-            if blocks[0][x][y][z + 1] != block_id:  # south
+            if ids[x, row, z + 1] != block_id:  # south
                 faces["south"] = True
 
         if x != self.xMax:
-            if blocks[0][x + 1][y][z] != block_id:  # east
+            if ids[x + 1, row, z] != block_id:  # east
                 faces["east"] = True
 
         if x != 0:
-            if blocks[0][x - 1][y][z] != block_id:  # west
+            if ids[x - 1, row, z] != block_id:  # west
                 faces["west"] = True
 
         return faces
 
-    def create_cluster(self, blocks):
+    def create_cluster(self, blocks, xRange=None, zRange=None):
+        """Meshes blocks (a worldvolume.WorldVolume) into a cluster per block id; y is world height.
+xRange and zRange ((start, stop) pairs) limit it to part of the volume, eg a tile of chunks (see
+mineregion.meshTiles); the blocks round that part still hide the faces against them."""
+
+        # sides looks no further than the volume goes
+        self.xMax = blocks.shape[0] - 1
+        self.zMax = blocks.shape[2] - 1
+        xStart, xStop = xRange if xRange is not None else (self.xMin, self.xMax)
+        zStart, zStop = zRange if zRange is not None else (self.zMin, self.zMax)
 
         clusters = {}
         i = 0
-        for x in range(self.zMin, self.xMax):
+        ids = blocks.ids
+        metas = blocks.metas
+        for x in range(max(xStart, self.xMin), min(xStop, self.xMax)):
             for y in range(self.yMin, self.yMax):
-                for z in range(self.xMin, self.zMax):
-                    block_id = blocks[0][x][y][z]
-                    if block_id not in [0, 166, 8, 9, 10, 11]:
+                row = y - blocks.yOrigin
+                for z in range(max(zStart, self.zMin), min(zStop, self.zMax)):
+                    block_id = ids[x, row, z]
+                    if blockregistry.MESHED[block_id]:  # not air, barriers or liquids
                         sides = self.sides(blocks, (x, y, z))  # Make a generator?
                         if True in sides.values():
-                            dvs = (blocks[0][x][y][z], blocks[1][x][y][z])
+                            dvs = (block_id, metas[x, row, z])
 
                             print(dvs)
 
@@ -472,6 +497,7 @@ class BlockCluster(Block):
 
         for cluster in clusters:
             clusters[cluster].finalise()
+        return clusters
 
     def cluster(self, dvs):
         print("finding name")
@@ -0,0 +1,305 @@
+# Block registry module: lookups over the block definitions in ids.json, built once at import.
+# Doesn't need Blender (unlike block.Block, which loads the same definitions).
+
+import json
+from os import path
+
+import numpy as npy
+
+with open(path.join(path.dirname(__file__), "ids.json"), "r") as f:
+    DEFS = json.load(f)
+
+BLOCK_TYPES = 256  # ids.json lists items too: the ids from here up are items, not blocks
+
+_COLOURS = ("white", "orange", "magenta", "light_blue", "yellow", "lime", "pink", "gray",
+            "light_gray", "cyan", "purple", "blue", "brown", "green", "red", "black")  # in data value order
+_WOODS = ("oak", "spruce", "birch", "jungle", "acacia", "dark_oak")  # in data value order
+
+
+def _flattenedNames():
+    names = {
+        "air": (0, 0), "cave_air": (0, 0), "void_air": (0, 0),
+        "stone": (1, 0), "granite": (1, 1), "polished_granite": (1, 2), "diorite": (1, 3),
+        "polished_diorite": (1, 4), "andesite": (1, 5), "polished_andesite": (1, 6),
+        "grass_block": (2, 0), "dirt": (3, 0), "coarse_dirt": (3, 1), "podzol": (3, 2),
+        "water": (9, 0), "lava": (11, 0), "sand": (12, 0), "red_sand": (12, 1),
+        "acacia_log": (162, 0), "dark_oak_log": (162, 1), "acacia_wood": (162, 12), "dark_oak_wood": (162, 13),
+        "acacia_leaves": (161, 0), "dark_oak_leaves": (161, 1), "wet_sponge": (19, 1),
+        "chiseled_sandstone": (24, 1), "cut_sandstone": (24, 2), "note_block": (25, 0),
+        "powered_rail": (27, 0), "cobweb": (30, 0),
+        "grass": (31, 1), "short_grass": (31, 1), "fern": (31, 2), "dead_bush": (32, 0),
+        "dandelion": (37, 0), "poppy": (38, 0), "blue_orchid": (38, 1), "allium": (38, 2), "azure_bluet": (38, 3),
+        "red_tulip": (38, 4), "orange_tulip": (38, 5), "white_tulip": (38, 6), "pink_tulip": (38, 7),
+        "oxeye_daisy": (38, 8),
+        "stone_slab": (44, 0), "smooth_stone_slab": (44, 0), "sandstone_slab": (44, 1),
+        "petrified_oak_slab": (44, 2), "cobblestone_slab": (44, 3), "brick_slab": (44, 4),
+        "stone_brick_slab": (44, 5), "nether_brick_slab": (44, 6), "quartz_slab": (44, 7),
+        "red_sandstone_slab": (182, 0), "purpur_slab": (205, 0),
+        "smooth_stone": (43, 0),  # (43:8, smooth double stone slab, has no definition to draw it with)
+        "bricks": (45, 0), "spawner": (52, 0), "wall_torch": (50, 0), "torch": (50, 5),
+        "furnace": (61, 0), "sign": (63, 0), "wall_sign": (68, 0), "iron_door": (71, 0),
+        "redstone_torch": (76, 5), "redstone_wall_torch": (76, 0),
+        "snow": (78, 0), "snow_block": (80, 0), "sugar_cane": (83, 0),
+        "carved_pumpkin": (86, 0), "nether_portal": (90, 0), "jack_o_lantern": (91, 0), "repeater": (93, 0),
+        "infested_stone": (97, 0), "infested_cobblestone": (97, 1), "infested_stone_bricks": (97, 2),
+        "infested_mossy_stone_bricks": (97, 3), "infested_cracked_stone_bricks": (97, 4),
+        "infested_chiseled_stone_bricks": (97, 5),
+        "stone_bricks": (98, 0), "mossy_stone_bricks": (98, 1), "cracked_stone_bricks": (98, 2),
+        "chiseled_stone_bricks": (98, 3), "mushroom_stem": (99, 10), "melon": (103, 0),
+        "attached_pumpkin_stem": (104, 7), "attached_melon_stem": (105, 7),
+        "lily_pad": (111, 0), "nether_bricks": (112, 0), "end_stone_bricks": (206, 0),
+        "mossy_cobblestone_wall": (139, 1), "skeleton_skull": (144, 0), "chipped_anvil": (145, 4),
+        "damaged_anvil": (145, 8), "comparator": (149, 0), "nether_quartz_ore": (153, 0),
+        "chiseled_quartz_block": (155, 1), "quartz_pillar": (155, 2),
+        "slime_block": (165, 0), "prismarine_bricks": (168, 1), "dark_prismarine": (168, 2), "terracotta": (172, 0),
+        "sunflower": (175, 0), "lilac": (175, 1), "tall_grass": (175, 2), "large_fern": (175, 3),
+        "rose_bush": (175, 4), "peony": (175, 5),
+        "chiseled_red_sandstone": (179, 1), "cut_red_sandstone": (179, 2),
+        "spruce_fence_gate": (183, 0), "birch_fence_gate": (184, 0), "jungle_fence_gate": (185, 0),
+        "dark_oak_fence_gate": (186, 0), "acacia_fence_gate": (187, 0),
+        "spruce_fence": (188, 0), "birch_fence": (189, 0), "jungle_fence": (190, 0),
+        "dark_oak_fence": (191, 0), "acacia_fence": (192, 0),
+        "spruce_door": (193, 0), "birch_door": (194, 0), "jungle_door": (195, 0),
+        "acacia_door": (196, 0), "dark_oak_door": (197, 0),
+        "oak_door": (64, 0), "oak_fence": (85, 0), "oak_fence_gate": (107, 0), "oak_trapdoor": (96, 0),
+        "oak_pressure_plate": (72, 0), "oak_button": (143, 0), "oak_stairs": (53, 0),
+        "spruce_stairs": (134, 0), "birch_stairs": (135, 0), "jungle_stairs": (136, 0),
+        "acacia_stairs": (163, 0), "dark_oak_stairs": (164, 0), "cobblestone_stairs": (67, 0),
+    }
+    for i, wood in enumerate(_WOODS):
+        names[wood + "_planks"] = (5, i)
+        names[wood + "_sapling"] = (6, i)
+        names[wood + "_slab"] = (126, i)
+        names[wood + "_sign"] = (63, 0)
+        names[wood + "_wall_sign"] = (68, 0)
+        if i < 4:
+            names[wood + "_log"] = (17, i)
+            names[wood + "_wood"] = (17, 12 + i)  # bark on all six sides
+            names[wood + "_leaves"] = (18, i)
+        if wood != "oak":
+            names[wood + "_button"] = (143, 0)
+            names[wood + "_pressure_plate"] = (72, 0)
+            names[wood + "_trapdoor"] = (96, 0)
+    for i, colour in enumerate(_COLOURS):
+        names[colour + "_wool"] = (35, i)
+        names[colour + "_stained_glass"] = (95, i)
+        names[colour + "_terracotta"] = (159, i)
+        names[colour + "_stained_glass_pane"] = (160, i)
+        names[colour + "_carpet"] = (171, i)
+        names[colour + "_bed"] = (26, 0)  # (the colour's in the bed's block entity)
+        names[colour + "_banner"] = (176, 0)
+        names[colour + "_wall_banner"] = (177, 0)
+    return names
+
+# 1.13+ ("flattened") block names -> legacy (id, meta), where they don't simply match a blockstate name in
+# ids.json or mean something different there (eg 'grass' is the plant now, and 'grass_block' the block).
+FLATTENED_NAMES = _flattenedNames()
+
+# How block state properties set the legacy data value. Per flattened name, a list of (property, values)
+# rules whose bits are or'd onto the name's meta: values is a dict of property value -> bits, or a function
+# of the property value. A rule with no property gets the whole properties dict instead (for blocks whose
+# halves use their bits differently).
+_FACING4 = {"south": 0, "west": 1, "north": 2, "east": 3}  # pumpkins, beds, repeaters, fence gates...
+_FACING6 = {"down": 0, "up": 1, "north": 2, "south": 3, "west": 4, "east": 5}  # chests, furnaces, ladders...
+_TORCH = (("facing", {"east": 1, "west": 2, "south": 3, "north": 4}),)
+_STAIRS = (("facing", {"east": 0, "west": 1, "south": 2, "north": 3}), ("half", {"top": 4}))
+_AXIS = (("axis", {"x": 4, "z": 8}),)
+_SLAB = (("type", {"top": 8}),)
+_TRAPDOOR = (("facing", {"north": 0, "south": 1, "west": 2, "east": 3}), ("open", {"true": 4}),
+             ("half", {"top": 8}))
+_RAIL_SHAPES = {"north_south": 0, "east_west": 1, "ascending_east": 2, "ascending_west": 3,
+                "ascending_north": 4, "ascending_south": 5,
+                "south_east": 6, "south_west": 7, "north_west": 8, "north_east": 9}
+_AGE = (("age", int),)
+
+
+def _doorMeta(properties):
+    if properties.get("half") == "upper":
+        return 8 | (properties.get("hinge") == "right") | (properties.get("powered") == "true") << 1
+    return {"east": 0, "south": 1, "west": 2, "north": 3}.get(properties.get("facing"), 0) | \
+        (properties.get("open") == "true") << 2
+
+PROPERTY_META = {
+    "water": (("level", int),), "lava": (("level", int),),
+    "furnace": (("facing", _FACING6),), "chest": (("facing", _FACING6),), "trapped_chest": (("facing", _FACING6),),
+    "ender_chest": (("facing", _FACING6),), "ladder": (("facing", _FACING6),), "wall_sign": (("facing", _FACING6),),
+    "dispenser": (("facing", _FACING6),), "dropper": (("facing", _FACING6),), "end_rod": (("facing", _FACING6),),
+    "hopper": (("facing", _FACING6),), "piston": (("facing", _FACING6), ("extended", {"true": 8})),
+    "sticky_piston": (("facing", _FACING6), ("extended", {"true": 8})),
+    "wall_torch": _TORCH, "redstone_wall_torch": _TORCH,
+    "sign": (("rotation", int),), "standing_banner": (("rotation", int),),
+    "carved_pumpkin": (("facing", _FACING4),), "jack_o_lantern": (("facing", _FACING4),),
+    "repeater": (("facing", _FACING4), ("delay", lambda v: (int(v) - 1) << 2)),
+    "comparator": (("facing", _FACING4), ("mode", {"subtract": 4}), ("powered", {"true": 8})),
+    "end_portal_frame": (("facing", _FACING4), ("eye", {"true": 4})),
+    "snow": (("layers", lambda v: int(v) - 1),), "cake": (("bites", int),),
+    "wheat": _AGE, "carrots": _AGE, "potatoes": _AGE, "beetroots": _AGE, "nether_wart": _AGE,
+    "cactus": _AGE, "sugar_cane": _AGE, "pumpkin_stem": _AGE, "melon_stem": _AGE, "fire": _AGE,
+    "farmland": (("moisture", int),), "redstone_wire": (("power", int),),
+    "rail": (("shape", _RAIL_SHAPES),),
+    "powered_rail": (("shape", _RAIL_SHAPES), ("powered", {"true": 8})),
+    "detector_rail": (("shape", _RAIL_SHAPES), ("powered", {"true": 8})),
+    "activator_rail": (("shape", _RAIL_SHAPES), ("powered", {"true": 8})),
+    "vine": (("south", {"true": 1}), ("west", {"true": 2}), ("north", {"true": 4}), ("east", {"true": 8})),
+    "iron_door": ((None, _doorMeta),), "iron_trapdoor": _TRAPDOOR,
+    "hay_block": _AXIS, "purpur_pillar": _AXIS,
+    "sunflower": (("half", {"upper": 8}),), "lilac": (("half", {"upper": 8}),),
+    "tall_grass": (("half", {"upper": 8}),), "large_fern": (("half", {"upper": 8}),),
+    "rose_bush": (("half", {"upper": 8}),), "peony": (("half", {"upper": 8}),),
+}
+
+# Block state properties that make it a different legacy block: name -> (property, value, id).
+PROPERTY_IDS = {
+    "furnace": ("lit", "true", 62), "redstone_ore": ("lit", "true", 74), "redstone_lamp": ("lit", "true", 124),
+    "redstone_torch": ("lit", "false", 75), "redstone_wall_torch": ("lit", "false", 75),
+    "repeater": ("powered", "true", 94), "comparator": ("powered", "true", 150),
+    "daylight_detector": ("inverted", "true", 178),
+}
+
+
+def _flattenedProperties():
+    for name, (blockID, meta) in FLATTENED_NAMES.items():
+        if name.endswith("_stairs"):
+            PROPERTY_META[name] = _STAIRS
+        elif name.endswith("_slab"):
+            PROPERTY_META[name] = _SLAB
+            PROPERTY_IDS[name] = ("type", "double", {44: 43, 126: 125, 182: 181, 205: 204}[blockID])
+        elif name.endswith(("_log", "_wood")):
+            PROPERTY_META[name] = _AXIS
+        elif name.endswith("_leaves"):
+            PROPERTY_META[name] = (("persistent", {"true": 4}),)
+        elif name.endswith("_door"):
+            PROPERTY_META[name] = ((None, _doorMeta),)
+        elif name.endswith("_trapdoor"):
+            PROPERTY_META[name] = _TRAPDOOR
+        elif name.endswith("_fence_gate"):
+            PROPERTY_META[name] = (("facing", _FACING4), ("open", {"true": 4}))
+        elif name.endswith("_bed"):
+            PROPERTY_META[name] = (("facing", _FACING4), ("occupied", {"true": 4}), ("part", {"head": 8}))
+        elif name.endswith("_wall_sign") or name.endswith("_wall_banner"):
+            PROPERTY_META[name] = (("facing", _FACING6),)
+        elif name.endswith("_sign") or name.endswith("_banner"):
+            PROPERTY_META[name] = (("rotation", int),)
+        elif name.endswith("_sapling"):
+            PROPERTY_META[name] = (("stage", lambda v: int(v) << 3),)
+
+_flattenedProperties()
+
+
+def propertyMeta(name, meta, properties):
+    """meta with a flattened block's state properties (a dict of strings) folded in, as PROPERTY_META says."""
+    for prop, values in PROPERTY_META.get(name, ()):
+        if prop is None:
+            meta |= values(properties)
+            continue
+        value = properties.get(prop)
+        if value is None:
+            continue
+        try:
+            meta |= values(value) if callable(values) else values.get(value, 0)
+        except ValueError:
+            pass
+    return meta & 0x0f
+
+
+def _buildNameTable():
+    names = {}
+    for d in DEFS:
+        if d["type"] < BLOCK_TYPES:
+            names.setdefault(d["blockstate"], (d["type"], d["meta"]))
+    for d in DEFS:
+        if d["type"] < BLOCK_TYPES:
+            names.setdefault(d["name"].lower().replace(" ", "_"), (d["type"], d["meta"]))
+    names.update(FLATTENED_NAMES)
+    return names
+
+BLOCK_NAMES = _buildNameTable()  # block name (no namespace) -> (id, meta)
+
+# Dense lookup tables, indexed by block id (and data value): a whole section's worth of ids can be looked up
+# with one fancy index, eg KNOWN[ids].
+BLOCK_ID_LIMIT = 4096  # ids are 12 bits at most (Blocks + Add)
+META_LIMIT = 16  # data values are 4 bits (ids.json's bigger metas are items, not blocks)
+
+# Render classes
+RENDER_NONE = 0         # air, and blocks nothing is drawn for
+RENDER_SOLID = 1        # any other known block: full cubes, but stairs, slabs, fences... too (not a culling test)
+RENDER_TRANSPARENT = 2  # full cubes that can be seen through (glass, leaves, ice...)
+RENDER_LIQUID = 3
+RENDER_PARTIAL = 4      # not a full cube: plants, torches, rails, slabs of snow...
+
+LIQUID_IDS = (8, 9, 10, 11)
+INVISIBLE_IDS = (0, 166)  # air, barrier
+TRANSPARENT_IDS = (18, 20, 52, 79, 95, 161)
+PARTIAL_IDS = (6, 26, 27, 28, 30, 31, 32, 37, 38, 39, 40, 50, 51, 55, 59, 63, 64, 65, 66, 68, 69, 70, 71, 72,
+    75, 76, 77, 78, 83, 90, 93, 94, 96, 101, 102, 104, 105, 106, 111, 115, 131, 132, 140, 141, 142, 143, 144,
+    147, 148, 149, 150, 157, 160, 167, 171, 175, 193, 194, 195, 196, 197)
+
+
+def _buildTables():
+    known = npy.zeros(BLOCK_ID_LIMIT, dtype=bool)
+    definition = npy.full((BLOCK_ID_LIMIT, META_LIMIT), -1, dtype=npy.int16)
+    for i, d in enumerate(DEFS):
+        if d["type"] < BLOCK_TYPES and d["meta"] < META_LIMIT:
+            known[d["type"]] = True
+            if definition[d["type"], d["meta"]] < 0:
+                definition[d["type"], d["meta"]] = i
+    # data values without a definition of their own (eg facing bits) fall back to the id's first one
+    for blockID in npy.flatnonzero(known):
+        row = definition[blockID]
+        first = row[row >= 0][0]
+        row[row < 0] = first
+
+    render = npy.where(known, RENDER_SOLID, RENDER_NONE).astype(npy.uint8)
+    render[list(TRANSPARENT_IDS)] = RENDER_TRANSPARENT
+    render[list(PARTIAL_IDS)] = RENDER_PARTIAL
+    render[list(LIQUID_IDS)] = RENDER_LIQUID
+    render[list(INVISIBLE_IDS)] = RENDER_NONE
+    render[~known] = RENDER_NONE
+    return known, definition, render
+
+KNOWN, DEFINITION, RENDER_CLASS = _buildTables()  # bool[id], DEFS index[id, meta] (-1: none), RENDER_*[id]
+MESHED = (RENDER_CLASS != RENDER_NONE) & (RENDER_CLASS != RENDER_LIQUID)  # bool[id]: BlockCluster builds these
+
+_keepTables = {}
+
+
+def keepTable(excluded=()):
+    """bool[id]: the blocks an import keeps (known, not air, not in excluded). Built once per set of exclusions."""
+    key = tuple(sorted(set(excluded)))
+    table = _keepTables.get(key)
+    if table is None:
+        table = KNOWN.copy()
+        table[0] = False
+        table[[blockID for blockID in key if 0 <= blockID < BLOCK_ID_LIMIT]] = False
+        _keepTables[key] = table
+    return table
+
+
+def definitionIndex(ids, metas):
+    """Indices into DEFS for ids and metas, arrays or single values (-1 where there's no definition)."""
+    return DEFINITION[ids, metas & (META_LIMIT - 1)]
+
+_paletteEntries = {}
+unknownBlockNames = set()
+
+
+def paletteEntryIDs(name, properties=None):
+    """Maps a section palette entry (block name, eg 'minecraft:stone', and its properties dict)
+to a legacy (id, meta) pair (see FLATTENED_NAMES, PROPERTY_META and PROPERTY_IDS), or None if it's not a block we know. Results are cached per distinct entry,
+so decoding a palette costs a dict lookup per entry rather than a search of the block definitions."""
+    key = (name, tuple(sorted(properties.items())) if properties else ())
+    ids = _paletteEntries.get(key, False)
+    if ids is False:
+        shortName = name.split(":", 1)[-1]
+        ids = BLOCK_NAMES.get(shortName)
+        if ids is not None and properties:
+            blockID, meta = ids
+            if shortName in PROPERTY_IDS:
+                prop, value, otherID = PROPERTY_IDS[shortName]
+                if properties.get(prop) == value:
+                    blockID = otherID
+            ids = (blockID, propertyMeta(shortName, meta, properties))
+        if ids is None:
+            unknownBlockNames.add(name)
+        _paletteEntries[key] = ids
+    return ids
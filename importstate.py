@@ -0,0 +1,23 @@
+# Import state module: the options and counters an import shares between mineregion and the chunk readers.
+# Doesn't need Blender, so decode worker processes can use the readers too (see mcanvilreader.decodeChunks).
+# These are all mutable: update them in place, never rebind them, or modules that imported them won't see it.
+
+REPORTING = {}
+REPORTING['totalchunks'] = 0
+REPORTING['blocksread'] = 0
+REPORTING['blocksdropped'] = 0
+# Anvil sections, by what became of them (see AnvilChunkReader._processBlocks):
+REPORTING['sectionsdecoded'] = 0
+REPORTING['sectionsclipped'] = 0     # wholly outside the Y limits
+REPORTING['sectionsempty'] = 0       # all air
+REPORTING['sectionsexcluded'] = 0    # nothing but air, excluded and unknown blocks
+
+COMMON_BLOCKS = (1, 3, 87)
+    # hack to reduce loading / slowdown: (1- Stone, 3- Dirt, 87 netherrack). Other usual suspects are Grass,Water, Leaves, Sand,StaticLava
+
+# TODO: Retrieve these from bpy.props properties stuck in the scene RNA.
+EXCLUDED_BLOCKS = list(COMMON_BLOCKS)  # emptied unless the 'omitstone' option is on
+
+unknownBlockIDs = set()
+
+OPTIONS = {}
@@ -0,0 +1,108 @@
+# Load area module: which chunks an import loads, and in what order.
+# Doesn't need Blender.
+
+import numpy as npy
+
+SHAPES = ('square', 'disc', 'polygon')
+ORDERS = ('raster', 'spiral', 'distance')
+TILE_CHUNKS = 4  # an import is meshed in square tiles this many chunks a side, so it can be re-meshed a tile at a time
+ORDER_WINDOW = 32  # chunks read as one batch (in file order) when a spiral or nearest-first order is kept to
+
+
+def squareArea(centreX, centreZ, radius):
+    """The (2 * radius + 1)^2 chunks around centre, as an (n, 2) array of x, z in z/x raster order."""
+    zs, xs = npy.mgrid[centreZ - radius:centreZ + radius + 1, centreX - radius:centreX + radius + 1]
+    return npy.stack((xs.ravel(), zs.ravel()), axis=-1)
+
+
+def discArea(centreX, centreZ, radius):
+    """The chunks of the square whose centres are within radius chunks of centre's (about 79% of them)."""
+    chunks = squareArea(centreX, centreZ, radius)
+    offsets = chunks - (centreX, centreZ)
+    return chunks[(offsets * offsets).sum(axis=1) <= radius * radius]
+
+
+def polygonArea(points, centreX, centreZ, radius):
+    """The chunks of the square whose centres are inside the polygon points ((x, z) pairs, in chunks; it
+needn't be convex, and is closed automatically), by the even-odd rule."""
+    chunks = squareArea(centreX, centreZ, radius)
+    px = chunks[:, 0] + 0.5
+    pz = chunks[:, 1] + 0.5
+    inside = npy.zeros(len(chunks), dtype=bool)
+    points = npy.asarray(points, dtype=npy.float64)
+    for (x0, z0), (x1, z1) in zip(points, npy.roll(points, -1, axis=0)):
+        # flip for each edge a ray from the chunk centre towards +x crosses
+        crosses = (z0 > pz) != (z1 > pz)
+        with npy.errstate(divide='ignore', invalid='ignore'):
+            xCross = x0 + (pz - z0) * (x1 - x0) / (z1 - z0)
+        inside ^= crosses & (px < xCross)
+    return chunks[inside]
+
+
+def ordered(chunks, centreX, centreZ, order="spiral"):
+    """chunks ((n, 2) array) in the given order: 'raster' leaves them be, 'spiral' goes out ring by square
+ring from the centre (round each ring from the -x, -z side), 'distance' nearest first (ties by angle)."""
+    if order == "raster" or len(chunks) == 0:
+        return chunks
+    dx = chunks[:, 0] - centreX
+    dz = chunks[:, 1] - centreZ
+    angle = npy.arctan2(dz, dx)
+    if order == "spiral":
+        ring = npy.maximum(npy.abs(dx), npy.abs(dz))
+    elif order == "distance":
+        ring = dx * dx + dz * dz
+    else:
+        raise ValueError("Unknown load order: %r" % order)
+    return chunks[npy.lexsort((angle, ring))]
+
+
+def loadArea(centreX, centreZ, radius, shape="square", order="raster", polygon=None):
+    """The chunks to load around chunk centreX, centreZ, as a list of (x, z) pairs: those of the given shape
+(polygon points are needed for 'polygon'; it's clipped to the square of the radius) in the given order."""
+    if shape == "square":
+        chunks = squareArea(centreX, centreZ, radius)
+    elif shape == "disc":
+        chunks = discArea(centreX, centreZ, radius)
+    elif shape == "polygon":
+        chunks = polygonArea(polygon, centreX, centreZ, radius)
+    else:
+        raise ValueError("Unknown load area shape: %r" % shape)
+    return [(int(x), int(z)) for x, z in ordered(chunks, centreX, centreZ, order)]
+
+
+def tileOf(chunkX, chunkZ):
+    """The (x, z) tile (see TILE_CHUNKS) chunk chunkX, chunkZ is in."""
+    return (chunkX // TILE_CHUNKS, chunkZ // TILE_CHUNKS)
+
+
+def tilesOf(chunks):
+    """The tiles chunks ((x, z) pairs) are in, sorted, without repeats."""
+    return sorted(set(tileOf(x, z) for x, z in chunks))
+
+
+def tileSurroundings(tiles, chunks):
+    """Those of chunks that are in tiles, or in the ring of chunks round them: what re-meshing the tiles
+needs decoded, as the blocks at a tile's edge show or hide their faces by their neighbours'."""
+    tiles = set(tiles)
+    return [(x, z) for x, z in chunks
+            if any(tileOf(x + dx, z + dz) in tiles for dx in (-1, 0, 1) for dz in (-1, 0, 1))]
+
+
+def orderWindow(order):
+    """The window (see regionfile.regionGroups) to read chunks in the given order with: none for 'raster',
+which gains nothing from being kept to, so whole regions are read in file order."""
+    return None if order == "raster" else ORDER_WINDOW
+
+
+def tileDependents(chunks):
+    """For meshing each tile as soon as its chunks are in: ({chunk: tiles}, {tile: count}), the tiles of chunks
+each of chunks (x, z pairs) is in or next to (see tileSurroundings), and how many of chunks each tile waits for."""
+    own = set(tilesOf(chunks))
+    dependents = {}
+    waiting = dict((tile, 0) for tile in own)
+    for x, z in chunks:
+        tiles = set(tileOf(x + dx, z + dz) for dx in (-1, 0, 1) for dz in (-1, 0, 1)) & own
+        dependents[(x, z)] = tiles
+        for tile in tiles:
+            waiting[tile] += 1
+    return dependents, waiting
@@ -1,13 +1,14 @@
+import multiprocessing
 import os
-import bpy
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from struct import unpack  # , error as StructError
-from . import nbtreader, mcregionreader
-from .mineregion import OPTIONS, EXCLUDED_BLOCKS,  REPORTING, unknownBlockIDs, WORLD_ROOT
-# ..yuck: they're immutable and don't return properly except for the dict-type ones. Get rid of this in next cleanup.
+import numpy as npy
+from . import nbtreader, mcregionreader, regionfile, sectionreader, blockregistry
+from .worldvolume import WorldVolume, HALO
+from .importstate import OPTIONS, EXCLUDED_BLOCKS, REPORTING, unknownBlockIDs
+# No Blender imports up here (bpy is only needed for entity markers): decode worker processes import this module.
 
-from math import floor
-from .block import Block
+DECODE_BATCH = 64  # chunks per task handed to a decode worker process
 
 
 class AnvilChunkReader(mcregionreader.ChunkReader):
@@ -15,51 +16,36 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
     # readBlock( bX, bZ (by?) ...  ignoring 'region' boundaries and chunk
     # boundaries? We need an ignore-chunk-boundaries level of abstraction
 
-    def getSingleBlock(chunkXZ, blockXYZ):  # returns the value and extradata bits for a single block of given absolute x,y,z block coords within chunk cx,cz. or None if area not generated.
+    REGION_EXT = "mca"
+
+    def getSingleBlock(self, chunkXZ, blockXYZ):  # returns the value and extradata bits for a single block of given absolute x,y,z block coords within chunk cx,cz. or None if area not generated.
         # y is value from 0..255
-        cx, cy = chunkXZ
-        bX, bY, bZ = blockXYZ
-        rX = floor(cx / 32)  # is this the same as >> 8 ??
-        rZ = floor(cz / 32)
-        rHdrOffset = ((cx % 32) + (cz % 32) * 32) * 4
-        rFile = "r.%d.%d.mca" % (rx, rz)
-        if not os.path.exists(rFile):
+        cx, cz = chunkXZ
+        dX, dY, dZ = blockXYZ
+        # possibly check for cached chunk data here, under the cx,cz in
+        # a list of already-loaded sets.
+        chunkdata = self._readChunkData(cx, cz, plain=True)
+        if chunkdata is None:
+            return None  # Region or chunk we're after was never created.
+        sections = chunkdata['Level']['Sections']
+        # each section is a 16x16x16 piece of chunk, with a Y-byte from 0-15, so that the 'y' value is 16*that + in-section-Y-value
+        # some sections can be skipped, so we must iterate to find the
+        # right one with the 'Y' we expect.
+        bSection = dY >> 4
+        sect = None
+        for section in sections:
+            if section['Y'] == bSection:
+                sect = section
+        if sect is None or 'Blocks' not in sect:
             return None
-        with open(rFile, 'rb') as regionfile:
-            regionfile.seek(rheaderoffset)
-            cheadr = regionfile.read(4)
-            dataoffset = unpack(">i", b'\x00' + cheadr[0:3])[0]
-            chunksectorcount = cheadr[3]
-            if dataoffset == 0 and chunksectorcount == 0:
-                return None  # Region exists, but the chunk we're after was never created within it.
-            else:
-                # possibly check for cached chunk data here, under the cx,cz in
-                # a list of already-loaded sets.
-                chunkdata = AnvilChunkReader._readChunkData(
-                    regionfile, dataoffset, chunksectorcount)
-                chunkLvl = chunkdata.value['Level'].value
-                sections = chunkLvl['Sections'].value
-                # each section is a 16x16x16 piece of chunk, with a Y-byte from 0-15, so that the 'y' value is 16*that + in-section-Y-value
-                # some sections can be skipped, so we must iterate to find the
-                # right one with the 'Y' we expect.
-                bSection = bY / 16
-                sect = None
-                for section in sections:
-                    secY = section.value['Y'].value
-                    if secY == bSection:
-                        sect = section.value
-                if sect is None:
-                    return None
-                blockData = sec[
-                    'Blocks'].value  # a TAG_Byte_Array value (bytes object). Blocks is 16x16 bytes
-                extraData = sec[
-                    'Data'].value  # BlockLight, Data and SkyLight are 16x16 "4-bit cell" additional data arrays.
-                sY = dY % 16
-                blockIndex = (sY * 16 + dZ) * 16 + dX
-                blockID = blockData[blockIndex]
-                return blockID  # , extravalue)
-                # NB: this can be made massively more efficient by storing 4 'neighbour chunk' data reads for every chunk properly processed.
-                # Don't need to do diagonals, even.
+        blockData = sect[
+            'Blocks']  # a TAG_Byte_Array value (uint8 view). Blocks is 16x16x16 bytes
+        sY = dY % 16
+        blockIndex = (sY * 16 + dZ) * 16 + dX
+        blockID = int(blockData[blockIndex])
+        return blockID  # , extravalue)
+        # NB: this can be made massively more efficient by storing 4 'neighbour chunk' data reads for every chunk properly processed.
+        # Don't need to do diagonals, even.
 
     # def readChunk(self, chunkPosX, chunkPosZ, vertexBuffer, processFunc):  #
     # aka "readChunkFromRegion" ...
@@ -68,69 +54,95 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
 
         global REPORTING
 
-        # region containing a given chunk is found thusly: floor of c over 32
-        regionX = floor(chunkPosX / 32)
-        regionZ = floor(chunkPosZ / 32)
-
-        rheaderoffset = ((chunkPosX % 32) + (chunkPosZ % 32) * 32) * 4
-
         # print("Reading chunk %d,%d from region %d,%d" %(chunkPosX, chunkPosZ,
         # regionX,regionZ))
 
-        rfileName = "r.%d.%d.mca" % (regionX, regionZ)
-        if not os.path.exists(rfileName):
-            # Can't load: it doesn't exist!
-            print("No such region generated.")
+        chunkdata = self._readChunkData(
+            chunkPosX, chunkPosZ, AnvilChunkReader.chunkPaths(OPTIONS), plain=True)  # todo: rename that function!
+        if chunkdata is None:
             return
+            # print("Region exists, but chunk has never been created within
+            # it.")
 
-        with open(rfileName, 'rb') as regfile:
-            # header for the chunk we want is at...
-            # The location in the region file of a chunk at (x, z) (in chunk coordinates) can be found at byte offset 4 * ((x mod 32) + (z mod 32) * 32) in its McRegion file.
-            # Its timestamp can be found 4096 bytes later in the file
-            regfile.seek(rheaderoffset)
-            cheadr = regfile.read(4)
-            dataoffset = unpack(">i", b'\x00' + cheadr[0:3])[0]
-            chunksectorcount = cheadr[3]
-
-            if dataoffset == 0 and chunksectorcount == 0:
-                pass
-                # print("Region exists, but chunk has never been created within
-                # it.")
-            else:
-                chunkdata = AnvilChunkReader._readChunkData(
-                    regfile, dataoffset, chunksectorcount)  # todo: rename that function!
-                # Geometry creation! etc... If surface only, can get heights etc
-                # from lightarray?
-
-                # top level tag in NBT is an unnamed TAG_Compound, for some
-                # reason, containing a named TAG_Compound "Level"
-                chunkLvl = chunkdata.value['Level'].value
-                # chunkXPos = chunkLvl['xPos'].value
-                # chunkZPos = chunkLvl['zPos'].value
-                # print("Reading blocks for chunk: (%d, %d)\n" % (chunkXPos, chunkZPos))
-                # AnvilChunkReader._readBlocks(chunkLvl, vertexBuffer)
-                processFunc(chunkLvl)
-                # print("Loaded chunk %d,%d" % (chunkPosX,chunkPosZ))
+        # Geometry creation! etc... If surface only, can get heights etc
+        # from lightarray?
 
-                REPORTING['totalchunks'] += 1
+        # top level tag in NBT is an unnamed TAG_Compound, for some
+        # reason, containing a named TAG_Compound "Level"
+        chunkLvl = chunkdata['Level']  # plain values: dicts, lists, ints and array views
+        # chunkXPos = chunkLvl['xPos']
+        # chunkZPos = chunkLvl['zPos']
+        # print("Reading blocks for chunk: (%d, %d)\n" % (chunkXPos, chunkZPos))
+        # AnvilChunkReader._readBlocks(chunkLvl, vertexBuffer)
+        processFunc(chunkLvl)
+        # print("Loaded chunk %d,%d" % (chunkPosX,chunkPosZ))
+
+        REPORTING['totalchunks'] += 1
 
-    def processChunk2(self, chunkPosX, chunkPosZ, blockBuffer, extraBuffer, zeroAdjX, zeroAdjZ):
-        # FIXME - implement me!
+    def processChunk2(self, chunkPosX, chunkPosZ, volume, zeroAdjX, zeroAdjZ):
         # print("reading chunk: "+str(chunkPosX)+","+str(chunkPosZ)+" offset:
         # "+str(zeroAdjX)+", "+str(zeroAdjZ)+" array chunk index:
         # "+str(chunkPosX+zeroAdjX)+", "+str(chunkPosZ+zeroAdjZ))
+        self.readChunk(chunkPosX, chunkPosZ,
+                       AnvilChunkReader._chunkProcessor2(chunkPosX, chunkPosZ, volume, zeroAdjX, zeroAdjZ))
+
+    def processChunks2(self, chunks, volume, zeroAdjX, zeroAdjZ, processes=1, interpreter=None, window=None):
+        """processChunk2 for a batch of chunks (x, z pairs), read in file order (see readChunks; with a window,
+only within each window of chunks, so they're decoded in about the order given), into volume
+(a worldvolume.WorldVolume). With processes > 1, the chunks are decoded by that many worker processes instead
+(see decodeChunks; interpreter is the Python they're started with). If the volume is shared, the workers write
+into it directly; otherwise their sections are copied in here.
+Yields each chunk's x, z once it's in the volume."""
+        if processes > 1:
+            regionDir = os.path.abspath(self.regions.directory)
+            target = None
+            if volume.shared is not None:
+                target = (volume.handle, zeroAdjX, zeroAdjZ)
+            decoded = decodeChunks(regionDir, chunks, processes, target, interpreter, window)
+            for chunkPosX, chunkPosZ, sections, entities in decoded:
+                volume.putSections(sections, (chunkPosX + zeroAdjX) * 16, (chunkPosZ + zeroAdjZ) * 16)
+                if entities:
+                    AnvilChunkReader._loadEntities(entities)
+                REPORTING['totalchunks'] += 1
+                yield (chunkPosX, chunkPosZ)
+            return
+
+        paths = AnvilChunkReader.chunkPaths(OPTIONS)
+        for chunkPosX, chunkPosZ, chunkdata in self.readChunks(chunks, paths, plain=True, window=window):
+            processFunc = AnvilChunkReader._chunkProcessor2(chunkPosX, chunkPosZ, volume, zeroAdjX, zeroAdjZ)
+            processFunc(chunkdata['Level'])
+            REPORTING['totalchunks'] += 1
+            yield (chunkPosX, chunkPosZ)
+
+    def _chunkProcessor2(chunkPosX, chunkPosZ, volume, zeroAdjX, zeroAdjZ):
+        baseX = (chunkPosX + zeroAdjX) * 16
+        # baseY = (chunkPosY+zeroAdjY)*16
+        baseZ = (chunkPosZ + zeroAdjZ) * 16
+
         def _internalProcessChunk2(lvl):  # handle chunk
             def _internalProcessBlock2(block, extra, dX, dY, dZ):  # handle blocks within a chunk
-                baseX = (chunkPosX + zeroAdjX) * 16
-                # baseY = (chunkPosY+zeroAdjY)*16
-                baseZ = (chunkPosZ + zeroAdjZ) * 16
-                blockBuffer[baseX + dX][dY][baseZ + dZ] = block
-                extraBuffer[baseX + dX][dY][baseZ + dZ] = extra
+                volume[0][baseX + dX][dY][baseZ + dZ] = block
+                volume[1][baseX + dX][dY][baseZ + dZ] = extra
                 # pass
             # pass
-            AnvilChunkReader._processBlocks(lvl, _internalProcessBlock2)
+            def _internalProcessSection2(secY, ids, metas):  # handle a whole (y,z,x) section at once
+                volume.putSection(baseX, baseZ, secY, ids, metas)
+            AnvilChunkReader._processBlocks(lvl, _internalProcessBlock2, _internalProcessSection2, HALO)
+        return _internalProcessChunk2
+
+    def chunkSections(chunkLevelData):
+        """Decodes a chunk's 'Level' compound (plain values) into a list of (sectionY, ids, metas): the block Y
+each section starts at, and its (16,16,16) y,z,x uint16 block ids and uint8 data values, filtered like
+_processBlocks filters them, with the volume's HALO rows past the Y limits. Sections with nothing in them after
+that are left out."""
+        sections = {}
 
-        self.readChunk(chunkPosX, chunkPosZ, _internalProcessChunk2)
+        def _internalProcessSection(secY, ids, metas):
+            if ids.any():
+                sections[secY] = (ids.astype(npy.uint16, copy=False), metas.astype(npy.uint8, copy=False))
+
+        AnvilChunkReader._processBlocks(chunkLevelData, None, _internalProcessSection, HALO)
+        return [(secY, ids, metas) for secY, (ids, metas) in sorted(sections.items())]
 
     def processChunk(self, chunkPosX, chunkPosY, vertexBuffer):
         def _internalProcessChunk(lvl):
@@ -139,46 +151,15 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
 
         self.readChunk(chunkPosX, chunkPosY, _internalProcessChunk)
 
-    def _readChunkData(bstream, chunkOffset, chunkSectorCount):  # rename this!
-        # get the datastring out of the file...
-        import io
-        import zlib
-
-        # cf = open(fname, 'rb')
-        initialPos = bstream.tell()
-
-        cstart = chunkOffset * 4096  # 4 kiB
-        clen = chunkSectorCount * 4096
-        bstream.seek(cstart)  # this bstream is the region file
-
-        chunkHeaderAndData = bstream.read(clen)
-
-        # chunk header stuff is:
-        # 4 bytes: length (of remaining data)
-        # 1 byte : compression type (1 - gzip - unused; 2 - zlib: it should always be this in actual fact)
-        # then the rest, is length-1 bytes of compressed (zlib) NBT data.
-
-        chunkDLength = unpack(">i", chunkHeaderAndData[0:4])[0]
-        chunkDCompression = chunkHeaderAndData[4]
-        if chunkDCompression != 2:
-            print("Not a zlib-compressed chunk!?")
-            raise StringError()  # MinecraftSomethingError, perhaps.
-
-        chunkZippedBytes = chunkHeaderAndData[5:]
-
-        # could/should check that chunkZippedBytes is same length as
-        # chunkDLength-1.
-
-        # put the regionfile byte stream back to where it started:
-        bstream.seek(initialPos)
-
-        # Read the compressed chunk data
-        zipper = zlib.decompressobj()
-        chunkData = zipper.decompress(chunkZippedBytes)
-        chunkDataAsFile = io.BytesIO(chunkData)
-        chunkNBT = nbtreader.readNBT(chunkDataAsFile)
-
-        return chunkNBT
+    def chunkPaths(options):
+        """The chunk NBT tag paths the importer reads with the given options; the rest of each chunk
+(lighting, TileTicks, and so on) is skipped at parse time rather than decoded. See nbtreader.compilePaths."""
+        paths = {'Level/xPos', 'Level/zPos', 'Level/Biomes',
+                 'Level/Sections/Y', 'Level/Sections/Blocks', 'Level/Sections/Add', 'Level/Sections/Data',
+                 'Level/Sections/Palette', 'Level/Sections/BlockStates'}
+        if not options.get('omitmobs', True):
+            paths.add('Level/Entities')
+        return paths
 
     def getSectionBlock(blockLoc, sectionDict):
         """Fetches a block from section NBT data."""
@@ -190,7 +171,7 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
         sY = bY & 0xf  # mod 16
         bIndex = (sY * 16 + bZ) * 16 + bX
         # bitshift, or run risk of int casts
-        dat = sect['Blocks'].value
+        dat = sect['Blocks']
         return dat[bIndex]
 
     # Hollow volumes optimisation (version1: in-chunk only)
@@ -293,9 +274,11 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
 
         return False
 
-    def _processBlocks(chunkLevelData, processFunc):
-        """readBlocks(chunkLevelData) -> takes a named TAG_Compound 'Level' containing a chunk's Anvil Y-Sections, each of which 0-15 has blocks, data, heightmap, xpos,zpos, etc.
-    Adds the data points into a 'vertexBuffer' which is a per-named-type dictionary of ????'s. That later is made into Blender geometry via from_pydata."""
+    def _processBlocks(chunkLevelData, processFunc, sectionFunc=None, halo=0):
+        """readBlocks(chunkLevelData) -> takes a chunk's 'Level' compound (as plain values: see nbtreader.readNBT) containing its Anvil Y-Sections, each of which 0-15 has blocks, data, heightmap, xpos,zpos, etc.
+    Adds the data points into a 'vertexBuffer' which is a per-named-type dictionary of ????'s. That later is made into Blender geometry via from_pydata.
+    Each section is decoded whole (see sectionreader) and goes to sectionFunc(secY, ids, metas) if given, else block by block to processFunc.
+    halo rows beyond each Y limit are decoded too: a volume's blocks at the limits look at them to tell which faces show."""
         # TODO: also TileEntities and Entities. Entities will generally be an empty list.
         # TileEntities are needed for some things to define fully...
 
@@ -305,21 +288,21 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
         global unknownBlockIDs, OPTIONS, REPORTING
 
         # chunkLocation = 'xPos' 'zPos' ...
-        chunkX = chunkLevelData['xPos'].value
-        chunkZ = chunkLevelData['zPos'].value
+        chunkX = chunkLevelData['xPos']
+        chunkZ = chunkLevelData['zPos']
         biomes = chunkLevelData[
-            'Biomes'].value  # yields a TAG_Byte_Array value (bytes object) of len 256 (16x16)
-        # heightmap = chunkLevelData['HeightMap'].value
+            'Biomes'] if 'Biomes' in chunkLevelData else None  # yields a TAG_Byte_Array value (uint8 view) of len 256 (16x16)
+        # heightmap = chunkLevelData['HeightMap']
         #'TileEntities' -- surely need this for piston data and stuff, no?
 
-        entities = chunkLevelData[
-            'Entities'].value    # load ze sheeps!! # a list of tag-compounds.
         # omitmobs = OPTIONS['omitmobs']
         if not OPTIONS['omitmobs']:
+            entities = chunkLevelData[
+                'Entities']    # load ze sheeps!! # a list of tag-compounds. (Only parsed when mobs are wanted: see chunkPaths)
             AnvilChunkReader._loadEntities(entities)
 
-        skyHighLimit = OPTIONS['highlimit']
-        depthLimit = OPTIONS['lowlimit']
+        skyHighLimit = OPTIONS['highlimit'] + halo
+        depthLimit = OPTIONS['lowlimit'] - halo
 
         CHUNKSIZE_X = 16
         CHUNKSIZE_Z = 16
@@ -327,7 +310,7 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
 
         # _Y_SHIFT = 7    # 2**7 is 128. use for fast multiply
         # _YZ_SHIFT = 11    #16 * 128 is 2048, which is 2**11
-        sections = chunkLevelData['Sections'].value
+        sections = chunkLevelData['Sections']
 
         # each section is a 16x16x16 piece of chunk, with a Y-byte from 0-15, so
         # that the 'y' value is 16*that + in-section-Y-value
@@ -338,74 +321,118 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
         # sectionDict => a dictionary of sections, indexed by Y.
         sDict = {}
         for section in sections:
-            sY = section.value['Y'].value
-            sDict[sY] = section.value
+            sY = section['Y']
+            sDict[sY] = section
 
         for section in sections:
-            sec = section.value
-            secY = sec['Y'].value * SECTNSIZE_Y
+            sec = section
+            secY = sec['Y'] * SECTNSIZE_Y
 
-            # if (secY + 16) < lowlimit, skip this section. no need to load it.
-            if (secY + 16 < depthLimit):
+            # Sections wholly below lowlimit or above highlimit aren't decoded at all. (They aren't always
+            # stored in Y order, so one above highlimit doesn't mean the rest are too.)
+            if secY + SECTNSIZE_Y <= depthLimit or secY > skyHighLimit:
+                REPORTING['sectionsclipped'] += 1
                 continue
 
-            if (secY > skyHighLimit):
-                return
-
-            # Now actually proceed with adding in the section's block data.
-            blockData = sec[
-                'Blocks'].value  # yields a TAG_Byte_Array value (bytes object). Blocks is 16x16 bytes
-            extraData = sec[
-                'Data'].value  # BlockLight, Data and SkyLight are 16x16 "4-bit cell" additional data arrays.
-            add = sec["Add"].value if "Add" in sec.keys() else None
-            # get starting Y from heightmap, ignoring excess height iterations...
-            # heightByte = heightMap[dX + (dZ << 4)]    # z * 16
-            # heightByte = 255    #quickFix: start from tip top, for now
-            # if heightByte > skyHighLimit:
-            #    heightByte = skyHighLimit
-
-            # go y 0 to 16...
-            for sy in range(16):
-                dY = secY + sy
-
-                if dY < depthLimit:
+            if 'Palette' in sec:
+                # 1.13+ section: palette + packed BlockStates instead of Blocks/Add/Data.
+                AnvilChunkReader._processPaletteSection(
+                    sec, secY, processFunc, sectionFunc, skyHighLimit, depthLimit)
+                continue
+            if 'Blocks' not in sec:
+                continue  # lighting-only section
+
+            # Blocks is 16x16x16 bytes of block id (low 8 bits); Add (optional) and Data are 4-bit-per-block
+            # arrays of the id's high bits and the data value. All unpacked in one go, unless there's
+            # nothing in its rows within the limits to keep.
+            keep = None
+            if sec.get('Add') is None:
+                keep = AnvilChunkReader._legacyKeep(sec['Blocks'], AnvilChunkReader._sectionRows(
+                    secY, skyHighLimit, depthLimit))
+                if keep is None:
                     continue
-                if dY > skyHighLimit:
-                    return
-
-                # dataX will be dX, blender X will be bX.
-                for dZ in range(CHUNKSIZE_Z):
-                    for dX in range(CHUNKSIZE_X):
-                        blockIndex = (sy * 16 + dZ) * 16 + dX
-                        blockID_a = blockData[blockIndex]
-
-                        blockID_b = AnvilChunkReader.nibble4(
-                            add, blockindex) if add else 0
-                        blockID = blockID_a + (blockID_b << 8)
-
-                        # create this block in the output!
-
-                        if blockID != 0 and blockID not in EXCLUDED_BLOCKS:    # 0 is air
-                            REPORTING['blocksread'] += 1
-                            if any(d["type"] == blockID for d in Block.defs):
-                                extraValue = AnvilChunkReader.nibble4(
-                                    extraData, blockIndex)
-                                processFunc(blockID, extraValue, dX, dY, dZ)
-                            else:
-                                unknownBlockIDs.add(blockID)
+            ids, metas = sectionreader.decodeLegacySection(sec['Blocks'], sec.get('Add'), sec.get('Data'))
+            AnvilChunkReader._processSection(ids, metas, secY, processFunc, sectionFunc, skyHighLimit, depthLimit,
+                                             keep)
+
+    def _processPaletteSection(sec, secY, processFunc, sectionFunc, skyHighLimit, depthLimit):
+        """Decodes a palette-format section in one go and hands it on like a legacy one (see _processSection).
+The palette is looked at first: if none of its entries is a block that's kept (a single-entry palette of
+air, say, or stone when stone is excluded), the BlockStates aren't unpacked at all."""
+        if 'BlockStates' not in sec and len(sec['Palette']) > 1:
+            return
+        palette = [(entry['Name'], entry.get('Properties')) for entry in sec['Palette']]
+        table = sectionreader.paletteTable(palette)
+        if not blockregistry.keepTable(EXCLUDED_BLOCKS)[table[:, 0]].any():
+            REPORTING['sectionsempty' if not table[:, 0].any() else 'sectionsexcluded'] += 1
+            return
+        blockStates = sec.get('BlockStates')
+        ids, metas = sectionreader.decodePaletteSection(palette, blockStates, table=table)
+        AnvilChunkReader._processSection(ids, metas, secY, processFunc, sectionFunc, skyHighLimit, depthLimit)
+
+    def _sectionRows(secY, skyHighLimit, depthLimit):
+        """The slice of a section's 16 rows that are within the Y limits."""
+        return slice(max(depthLimit - secY, 0), max(min(skyHighLimit - secY + 1, 16), 0))
+
+    def _legacyKeep(blocks, rows):
+        """The keep mask (see _processSection) of a legacy section without Add, looked up straight from its
+Blocks bytes over just the given rows; or None (and counted) if there's nothing in them to keep: all air, or
+air and excluded blocks. Then the section needn't be decoded at all."""
+        lowIDs = npy.frombuffer(blocks, dtype=npy.uint8) if isinstance(blocks, (bytes, bytearray, memoryview)) \
+            else npy.asarray(blocks, dtype=npy.uint8)
+        lowIDs = lowIDs[:sectionreader.SECTION_BLOCKS].reshape(16, 16, 16)[rows]
+        keep = npy.zeros((16, 16, 16), dtype=bool)
+        keep[rows] = blockregistry.keepTable(EXCLUDED_BLOCKS)[lowIDs]
+        if keep.any():
+            return keep
+        unknown = ~blockregistry.KNOWN[lowIDs]
+        if unknown.any():
+            unknownBlockIDs.update(npy.unique(lowIDs[unknown]).tolist())
+        REPORTING['sectionsempty' if not lowIDs.any() else 'sectionsexcluded'] += 1
+        return None
+
+    def _processSection(ids, metas, secY, processFunc, sectionFunc, skyHighLimit, depthLimit, keep=None):
+        """Filters a decoded section (4096 ids and metas, in section order) and hands it on as (16,16,16) y,z,x
+id and meta arrays to sectionFunc(secY, ids, metas) if given, else block by block to processFunc.
+Air, excluded blocks, ids there's no definition for and rows outside the Y limits are zeroed; unknown ids
+are noted in unknownBlockIDs. The block filter is a lookup table (see blockregistry.keepTable), so it's
+one fancy index for the whole section (or none, if the caller has the (16,16,16) keep mask already)."""
+        global REPORTING
+        ids = ids.reshape(16, 16, 16)
+        metas = metas.reshape(16, 16, 16)
+
+        # only the rows within the Y limits are looked up at all
+        rows = AnvilChunkReader._sectionRows(secY, skyHighLimit, depthLimit)
+        if keep is None:
+            keep = npy.zeros((16, 16, 16), dtype=bool)
+            keep[rows] = blockregistry.keepTable(EXCLUDED_BLOCKS)[ids[rows]]
+        unknown = ~blockregistry.KNOWN[ids[rows]]
+        if unknown.any():
+            unknownBlockIDs.update(npy.unique(ids[rows][unknown]).tolist())
+        REPORTING['sectionsdecoded'] += 1
+        REPORTING['blocksread'] += int(npy.count_nonzero(keep))
+        ids = npy.where(keep, ids, 0)
+        metas = npy.where(keep, metas, 0)
+
+        if sectionFunc is not None:
+            sectionFunc(secY, ids, metas)
+        else:
+            for sy, dZ, dX in zip(*npy.nonzero(keep)):
+                processFunc(int(ids[sy, dZ, dX]), int(metas[sy, dZ, dX]), int(dX), secY + int(sy), int(dZ))
 
     def nibble4(arr, idx):
-        return arr[floor(idx / 2)] & 0x0f if idx % 2 == 0 else (arr[floor(idx / 2)] >> 4) & 0x0f
+        return int(arr[idx >> 1]) & 0x0f if idx % 2 == 0 else (int(arr[idx >> 1]) >> 4) & 0x0f
 
     def _loadEntities(entities):
-        global WORLD_ROOT
+        import bpy
+        from .mineregion import WORLD_ROOT  # set per import, so it can't be imported at the top
         for e in entities:
-            eData = e.value
+            eData = e
 
-            etypename = eData['id'].value  # eg 'Sheep'
+            etypename = eData['id']  # eg 'Sheep'
             ename = "en%sMarker" % etypename
-            epos = [p.value for p in eData['Pos'].value]  # list[3] of double
-            erot = [r.value for r in eData['Rotation'].value]
+            epos = eData['Pos']  # list[3] of double
+            erot = eData['Rotation']
                 # list[2] of float ([0] orientation (angle round Z-axis) and [1]
                 # 0.00, probably y-tilt.
 
@@ -424,3 +451,88 @@ class AnvilChunkReader(mcregionreader.ChunkReader):
 
             bpy.context.scene.objects.link(entMarker)
             entMarker.parent = WORLD_ROOT
+
+
+# Process-pool decoding: the NBT walk and block extraction hold the GIL, so for big imports they're spread
+# over worker processes. Workers run without Blender (they're spawned, so import only this module and what
+# it needs), open the world's region files themselves, and send back just the compact section arrays of
+# each chunk for the parent to copy into its volume.
+
+_workerReader = None
+_workerVolumes = {}  # volume handle -> WorldVolume, attached to on first use
+
+
+def _initDecodeWorker(regionDir, options, excludedBlocks):
+    global _workerReader
+    OPTIONS.clear()
+    OPTIONS.update(options)
+    OPTIONS['omitmobs'] = True  # entities are sent back as data: markers have to be made in Blender
+    EXCLUDED_BLOCKS[:] = excludedBlocks
+    _workerReader = AnvilChunkReader(regionfile.RegionFilePool(regionDir))
+
+
+def _workerVolume(handle):
+    volume = _workerVolumes.get(handle)
+    if volume is None:
+        volume = _workerVolumes[handle] = WorldVolume.attach(handle)
+    return volume
+
+
+def _decodeChunkBatch(chunks, withEntities, target=None):
+    """Worker: decodes chunks (x, z pairs, all from one region), returning ([(x, z, sections, entities)...],
+REPORTING counts, unknown block ids) with sections as AnvilChunkReader.chunkSections gives them. If there's a
+target (shared WorldVolume handle, zeroAdjX, zeroAdjZ), the sections are written straight into that
+volume instead, and come back empty."""
+    counters = dict(REPORTING)
+    unknownBlockIDs.clear()
+    paths = AnvilChunkReader.chunkPaths(dict(OPTIONS, omitmobs=not withEntities))
+    results = []
+    for chunkPosX, chunkPosZ, chunkdata in _workerReader.readChunks(chunks, paths, plain=True):
+        lvl = chunkdata['Level']
+        entities = []
+        if withEntities:
+            entities = [{'id': e['id'], 'Pos': list(e['Pos']), 'Rotation': list(e['Rotation'])}
+                        for e in lvl.get('Entities', ())]
+        sections = AnvilChunkReader.chunkSections(lvl)
+        if target is not None:
+            handle, zeroAdjX, zeroAdjZ = target
+            _workerVolume(handle).putSections(sections, (chunkPosX + zeroAdjX) * 16, (chunkPosZ + zeroAdjZ) * 16)
+            sections = []
+        results.append((chunkPosX, chunkPosZ, sections, entities))
+    return results, dict((key, REPORTING[key] - counters[key]) for key in REPORTING), set(unknownBlockIDs)
+
+
+def decodeChunks(regionDir, chunks, processes, target=None, interpreter=None, window=None):
+    """Decodes chunks (x, z pairs) of the Anvil world whose region files are in regionDir over a pool of
+processes worker processes, yielding (chunkPosX, chunkPosZ, sections, entities) as batches finish (so only
+roughly in the order of chunks). Counters and unknown block ids from the workers are added to this process's.
+With a target (see _decodeChunkBatch) the workers put the sections into a shared volume themselves.
+Workers are started with interpreter if it's given, else sys.executable: in Blender that's Blender itself, so
+it has to be given there (see mineregion.workerInterpreter). A window groups chunks by region only within
+each window of them (see regionfile.regionGroups), so batches keep closer to the order of chunks."""
+    batches = []
+    for region, regionChunks in regionfile.regionGroups(chunks, window):
+        batches.extend(regionChunks[i:i + DECODE_BATCH] for i in range(0, len(regionChunks), DECODE_BATCH))
+    # hand out batches in the order chunks asks for them (eg nearest first), not region by region
+    position = dict((chunk, i) for i, chunk in enumerate(chunks))
+    batches.sort(key=lambda batch: position[batch[0]])
+
+    withEntities = not OPTIONS['omitmobs']
+    context = multiprocessing.get_context('spawn')
+    if interpreter is not None:
+        context.set_executable(interpreter)
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_initDecodeWorker,
+                             initargs=(regionDir, dict(OPTIONS), list(EXCLUDED_BLOCKS))) as executor:
+        futures = [executor.submit(_decodeChunkBatch, batch, withEntities, target) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                results, counts, unknownIDs = future.result()
+                for key, count in counts.items():
+                    REPORTING[key] += count
+                unknownBlockIDs.update(unknownIDs)
+                for result in results:
+                    yield result
+        finally:
+            for future in futures:  # caller stopped early (or a worker failed)
+                future.cancel()
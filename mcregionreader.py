@@ -1,14 +1,11 @@
 # FIXME - obsolete and likely no longer working as of 1.6.3... any reason
 # to keep around?
 
-import os
-
-from struct import unpack  # , error as StructError
-from . import nbtreader
-from mathutils import Vector
-from .mineregion import OPTIONS, EXCLUDED_BLOCKS, REPORTING, unknownBlockIDs, getMCBlockType, mcToBlendCoord  # yuck!
-# ..yuck: they're immutable and don't return properly except for the dict-type ones. Get rid of this in next cleanup.
-from .block import Block
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from . import nbtreader, regionfile
+from .importstate import OPTIONS, EXCLUDED_BLOCKS, REPORTING, unknownBlockIDs
+# (no Blender imports up here: this is the base of AnvilChunkReader, which decode worker processes use.)
 
 
 class ChunkReader:
@@ -17,98 +14,103 @@ class ChunkReader:
     # and chunk boundaries? We need an ignore-chunk-boundaries level of
     # abstraction
 
+    REGION_EXT = "mcr"
+
+    def __init__(self, regions=None, threads=1):
+        # The world's region files: shared with other readers when a pool is passed in.
+        self.regions = regions if regions is not None else regionfile.RegionFilePool()
+        self.threads = max(1, threads)  # for decompressing and parsing in readChunks
+
+    def close(self):
+        """Closes the region files opened for this reader."""
+        self.regions.close()
+
     def readChunk(self, chunkPosX, chunkPosZ, vertexBuffer):  # aka "readChunkFromRegion" ...
         """Loads chunk located at the X,Z chunk location provided."""
-        from math import floor
         global REPORTING
 
-        # region containing a given chunk is found thusly: floor of c over 32
-        regionX = floor(chunkPosX / 32)
-        regionZ = floor(chunkPosZ / 32)
-
-        rheaderoffset = ((chunkPosX % 32) + (chunkPosZ % 32) * 32) * 4
-
         # print("Reading chunk %d,%d from region %d,%d" %(chunkPosX, chunkPosZ,
         # regionX,regionZ))
 
-        rfileName = "r.%d.%d.mcr" % (regionX, regionZ)
-        if not os.path.exists(rfileName):
-            # Can't load: it doesn't exist!
-            print("No such region generated.")
-            return
+        chunkdata = self._readChunkData(chunkPosX, chunkPosZ)  # todo: rename that function!
+        if chunkdata is None:
+            pass
+            # print("Region exists, but chunk has never been created within
+            # it.")
+        else:
+            # Geometry creation! etc... If surface only, can get heights etc
+            # from lightarray?
+
+            # top level tag in NBT is an unnamed TAG_Compound, for some
+            # reason, containing a named TAG_Compound "Level"
+            chunkLvl = chunkdata.value['Level'].value
+            # chunkXPos = chunkLvl['xPos'].value
+            # chunkZPos = chunkLvl['zPos'].value
+            # print("Reading blocks for chunk: (%d, %d)\n" % (chunkXPos,
+            # chunkZPos))
+            ChunkReader.readBlocks(chunkLvl, vertexBuffer)
+            # print("Loaded chunk %d,%d" % (chunkPosX,chunkPosZ))
+
+            REPORTING['totalchunks'] += 1
+
+    def _readChunkData(self, chunkPosX, chunkPosZ, paths=None, plain=False):  # rename this!
+        """Reads and parses the NBT of the chunk at chunkPosX, chunkPosZ; None if it was never generated."""
+        # region containing a given chunk is found thusly: floor of c over 32
+        region = self.regions.regionFile(*regionfile.regionOf(chunkPosX, chunkPosZ), ext=self.REGION_EXT)
+        if region is None:
+            return None
 
-        with open(rfileName, 'rb') as regfile:
-            # header for the chunk we want is at...
-            # The location in the region file of a chunk at (x, z) (in chunk coordinates) can be found at byte offset 4 * ((x mod 32) + (z mod 32) * 32) in its McRegion file.
-            # Its timestamp can be found 4096 bytes later in the file
-            regfile.seek(rheaderoffset)
-            cheadr = regfile.read(4)
-            dataoffset = unpack(">i", b'\x00' + cheadr[0:3])[0]
-            chunksectorcount = cheadr[3]
-
-            if dataoffset == 0 and chunksectorcount == 0:
-                pass
-                # print("Region exists, but chunk has never been created within
-                # it.")
-            else:
-                chunkdata = self._readChunkData(
-                    regfile, dataoffset, chunksectorcount)  # todo: rename that function!
-                # Geometry creation! etc... If surface only, can get heights etc
-                # from lightarray?
-
-                # top level tag in NBT is an unnamed TAG_Compound, for some
-                # reason, containing a named TAG_Compound "Level"
-                chunkLvl = chunkdata.value['Level'].value
-                # chunkXPos = chunkLvl['xPos'].value
-                # chunkZPos = chunkLvl['zPos'].value
-                # print("Reading blocks for chunk: (%d, %d)\n" % (chunkXPos,
-                # chunkZPos))
-                ChunkReader.readBlocks(chunkLvl, vertexBuffer)
-                # print("Loaded chunk %d,%d" % (chunkPosX,chunkPosZ))
-
-                REPORTING['totalchunks'] += 1
-
-    def _readChunkData(self, bstream, chunkOffset, chunkSectorCount):  # rename this!
-        # get the datastring out of the file...
-        import io
-        import zlib
-
-        # cf = open(fname, 'rb')
-        initialPos = bstream.tell()
-
-        cstart = chunkOffset * 4096  # 4 kiB
-        clen = chunkSectorCount * 4096
-        bstream.seek(cstart)  # this bstream is the region file
-
-        chunkHeaderAndData = bstream.read(clen)
-
-        # chunk header stuff is:
-        # 4 bytes: length (of remaining data)
-        # 1 byte : compression type (1 - gzip - unused; 2 - zlib: it should always be this in actual fact)
-        # then the rest, is length-1 bytes of compressed (zlib) NBT data.
-
-        chunkDLength = unpack(">i", chunkHeaderAndData[0:4])[0]
-        chunkDCompression = chunkHeaderAndData[4]
-        if chunkDCompression != 2:
-            print("Not a zlib-compressed chunk!?")
-            raise StringError()  # MinecraftSomethingError, perhaps.
-
-        chunkZippedBytes = chunkHeaderAndData[5:]
-
-        # could/should check that chunkZippedBytes is same length as
-        # chunkDLength-1.
-
-        # put the regionfile byte stream back to where it started:
-        bstream.seek(initialPos)
-
-        # Read the compressed chunk data
-        zipper = zlib.decompressobj()
-        chunkData = zipper.decompress(chunkZippedBytes)
-        chunkDataAsFile = io.BytesIO(chunkData)
-        chunkNBT = nbtreader.readNBT(chunkDataAsFile)
+        # The region header (parsed when the file was opened) says where the chunk is, if anywhere;
+        # its payload is then decompressed straight out of the mapped file.
+        chunkData = region.readChunkData(chunkPosX, chunkPosZ)
+        if chunkData is None:
+            return None
+        chunkNBT = nbtreader.readNBT(chunkData, paths, plain=plain)
 
         return chunkNBT
 
+    def chunkTimestamps(self, chunks):
+        """When each of chunks (x, z pairs) was last saved, in seconds since the epoch, from the timestamp
+tables of their region files' headers; 0 for chunks that were never generated."""
+        times = []
+        for chunkPosX, chunkPosZ in chunks:
+            region = self.regions.regionFile(*regionfile.regionOf(chunkPosX, chunkPosZ), ext=self.REGION_EXT)
+            times.append(region.chunkTimestamp(chunkPosX, chunkPosZ) if region is not None else 0)
+        return times
+
+    def readChunks(self, chunks, paths=None, plain=False, window=None):
+        """Reads many chunks (x, z pairs) at once, yielding (chunkPosX, chunkPosZ, chunk NBT) for those that exist.
+They come a region at a time in the order they're stored in the file, which reads far faster than going
+chunk by chunk, so don't count on the order they were asked for; unless there's a window, when that's done
+a window of chunks at a time (see RegionFilePool.chunkPayloads), so they come in about the order asked for.
+The order is the same every time, though, however many threads decode them."""
+        def _decode(payload):
+            return nbtreader.readNBT(regionfile.decompressChunk(*payload), paths, plain=plain)
+
+        payloads = self.regions.chunkPayloads(chunks, self.REGION_EXT, window)
+        if self.threads == 1:
+            for chunkPosX, chunkPosZ, payload in payloads:
+                yield (chunkPosX, chunkPosZ, _decode(payload))
+            return
+
+        # zlib lets go of the GIL while it works, so a few threads decompress (and parse) chunks ahead of the caller.
+        # Results are handed back in the order they were read, with up to 2 per thread in flight.
+        executor = ThreadPoolExecutor(max_workers=self.threads)
+        pending = deque()
+        try:
+            for chunkPosX, chunkPosZ, payload in payloads:
+                pending.append((chunkPosX, chunkPosZ, executor.submit(_decode, payload)))
+                if len(pending) >= 2 * self.threads:
+                    chunkPosX, chunkPosZ, future = pending.popleft()
+                    yield (chunkPosX, chunkPosZ, future.result())
+            while pending:
+                chunkPosX, chunkPosZ, future = pending.popleft()
+                yield (chunkPosX, chunkPosZ, future.result())
+        finally:
+            for chunkPosX, chunkPosZ, future in pending:  # caller stopped early (or something failed)
+                future.cancel()
+            executor.shutdown(wait=True)
+
     # Hollow volumes optimisation (version1: in-chunk only)
     def _isExposedBlock(dX, dY, dZ, blockData, blockID, idAbove, skyHighLimit, depthLimit):
         # fail-fast. checks if all ortho adjacent neighbours fall inside this chunk.
@@ -299,6 +301,8 @@ class ChunkReader:
     def createBlockChunk(blockID, chunkPos, blockPos, extraBlockData, vertBuffer):
         """adds a vertex to the blockmesh for blockID in the relevant location."""
 
+        from .mineregion import getMCBlockType, mcToBlendCoord
+
         # chunkpos is X,Z; blockpos is x,y,z for block.
         mesh = getMCBlockType(blockID, extraBlockData)
                               # this could be inefficient. Perhaps create all
@@ -323,6 +327,7 @@ class ChunkReader:
 
     def createBlock(blockID, blockPos, extraBlockData, vertBuffer):
         """adds a vertex to the blockmesh for blockID in the relevant location."""
+        from mathutils import Vector
 
         # chunkpos is X,Z; blockpos is x,y,z for block.
         # mesh = getMCBlockType(blockID, extraBlockData)  #this could be
@@ -32,7 +32,7 @@
 # walls, caves, etc. water should count as transparent for this process,
 # as should glass, flowers, torches, portal; all nonsolid block types.
 
-#"Load horizon" / "load radius": should be circular, or have options
+#"Load horizon" / "load radius": square, disc or polygon now (see loadarea).
 
 import bpy
 
@@ -55,8 +55,9 @@ import gzip
 import datetime
 
 
-REPORTING = {}
-REPORTING['totalchunks'] = 0
+from .importstate import OPTIONS, EXCLUDED_BLOCKS, COMMON_BLOCKS, REPORTING, unknownBlockIDs
+from . import loadarea
+from .worldvolume import WorldVolume
 totalchunks = 0
 wseed = None  # store chosen world's worldseed, handy for slimechunk calcs.
 
@@ -65,20 +66,10 @@ MCREGION_VERSION_ID = 0x4abc
 ANVIL_VERSION_ID = 0x4abd
 #
 
-# TODO: Retrieve these from bpy.props properties stuck in the scene RNA.
-EXCLUDED_BLOCKS = [1, 3, 87]
-    # (1,3,87) # hack to reduce loading / slowdown: (1- Stone, 3- Dirt, 87 netherrack). Other usual suspects are Grass,Water, Leaves, Sand,StaticLava
-
 LOAD_AROUND_3D_CURSOR = False  # calculates 3D cursor as a Minecraft world position, and loads around that instead of player (or SMP world spawn) position
 
-unknownBlockIDs = set()
-
-OPTIONS = {}
-
 #"Profile" execution checks for measuring whether optimisations are worth it:
 
-REPORTING['blocksread'] = 0
-REPORTING['blocksdropped'] = 0
 t0 = datetime.datetime.now()
 tReadAndBuffered = -1
 tToMesh = -1
@@ -297,7 +288,7 @@ def getWorldSelectList():
                 wData = None
                 try:
                     with gzip.open(sf + '/level.dat', 'rb') as levelDat:
-                        wData = readNBT(levelDat)
+                        wData = readNBT(levelDat, lazy=True)  # only a couple of Data values are needed
                         # catch errors if level.dat wasn't a gzip...
                 except IOError:
                     print("Unknown problem with level.dat format for %s" % sf)
@@ -355,7 +346,9 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
     global EXCLUDED_BLOCKS
     global WORLD_ROOT
     global OPTIONS, REPORTING
-    OPTIONS = toggleOptions
+    # update in place: the chunk readers imported this dict, so rebinding it here would leave them with a stale one.
+    OPTIONS.clear()
+    OPTIONS.update(toggleOptions)
 
     # timing/profiling:
     global tChunkReadTimes
@@ -365,8 +358,8 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
         print("No valid saved worlds were available to load.")
         return
 
-    if not OPTIONS['omitstone']:
-        EXCLUDED_BLOCKS = []
+    # in place, like OPTIONS above
+    EXCLUDED_BLOCKS[:] = COMMON_BLOCKS if OPTIONS['omitstone'] else []
 
     worldList = []
 
@@ -402,7 +395,7 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
     worldFormat = 'mcregion'  # assume initially
 
     with gzip.open('level.dat', 'rb') as levelDat:
-        worldData = readNBT(levelDat)
+        worldData = readNBT(levelDat, lazy=True)
     # print(worlddata.printTree(0))
 
     # Check if it's a multiplayer saved game (that's been moved into saves dir)
@@ -466,9 +459,6 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
     regionreader = None
     worldFormat == 'anvil'
 
-    from .mcanvilreader import AnvilChunkReader
-    regionreader = AnvilChunkReader()
-
     # except when loading nether...
     playerChunk = toChunkPos(pPos[0], pPos[2])  # x, z
 
@@ -488,13 +478,12 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
 
     # total chunk count across region files:
     REPORTING['totalchunks'] = 0
+    for key in ('sectionsdecoded', 'sectionsclipped', 'sectionsempty', 'sectionsexcluded'):
+        REPORTING[key] = 0
 
     pX = int(playerChunk[0])
     pZ = int(playerChunk[1])
 
-    print('Loading a square halfwidth of %d chunks around load position, so creating chunks: %d,%d to %d,%d' %
-          (loadRadius, pX - loadRadius, pZ - loadRadius, pX + loadRadius, pZ + loadRadius))
-
     if (OPTIONS['showslimes']):
         slimeOn()
         from . import slimes
@@ -503,9 +492,25 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
     # FIXME - need deltaX/Y/Z to get array index
     zeroAdjX = -1 * (pX - loadRadius)
     zeroAdjZ = -1 * (pZ - loadRadius)
-    # zeroAdjY = -1 * OPTIONS['lowlimit']
-    # sizeY = OPTIONS['highlimit']-OPTIONS['lowlimit']+1
-    sizeY = 256
+
+    wm = bpy.context.window_manager
+    wm.progress_begin(0, 99)
+    progCounter = 0
+    # The load area: a square, disc or polygon (within the square) of chunks, in raster, spiral or nearest-first order.
+    loadShape = OPTIONS.get('loadShape', 'square')
+    loadPolygon = None
+    if loadShape == 'polygon':
+        loadPolygon = OPTIONS.get('loadPolygon') or polygonChunks(bpy.context.active_object)
+        if loadPolygon is None:
+            loadShape = 'square'
+        OPTIONS['loadPolygon'] = loadPolygon  # (recorded with the import, for re-importing)
+    loadOrder = OPTIONS.get('loadOrder', 'raster')
+    chunks = loadarea.loadArea(pX, pZ, loadRadius, loadShape, loadOrder, loadPolygon)
+    print('Loading a %s of %d chunks (halfwidth %d) around chunk %d,%d, in %s order, within chunks %d,%d to %d,%d' %
+          (loadShape, len(chunks), loadRadius, pX, pZ, loadOrder,
+           pX - loadRadius, pZ - loadRadius, pX + loadRadius, pZ + loadRadius))
+    loadChunks = worldIndex(worldSelected).present(chunks)  # skip empty space without touching region files
+    print("%d of those chunks have been generated" % len(loadChunks))
 
     # for newVoxel and other approaches that process the entire world section
     # as a whole
@@ -513,36 +518,52 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
     # numElements=(loadRadius*2)*16 # chunks * blocks
     # print("block buffer size: "+str(numElements)+", "+str(sizeY)+",
     # "+str(numElements))
+    # Block ids and data values, as uint16 and uint8, of just the heights being imported (and a block either
+    # side: see WorldVolume.forHeights). With sharedVolume on they're in shared memory, so decode worker
+    # processes fill them in place; that's freed when released below, however the import ends.
+    world = WorldVolume.forHeights(numElements, numElements, OPTIONS['lowlimit'], OPTIONS['highlimit'],
+                                   OPTIONS.get('sharedVolume', False))
     print("block buffer size: " + str(numElements)
-          + ", " + str(sizeY) + ", " + str(numElements))
-    blockBuffer = npy.zeros((numElements, sizeY, numElements))
-    extraBuffer = npy.zeros((numElements, sizeY, numElements))
-
-    wm = bpy.context.window_manager
-    wm.progress_begin(0, 99)
-    progCounter = 0
-    progMax = (pZ + loadRadius + 1) - (pZ - loadRadius)
-    for z in range(pZ - loadRadius, pZ + loadRadius + 1):
-        wm.progress_update(((progCounter / progMax) / 2) * 100)
-        progCounter += 1
-        for x in range(pX - loadRadius, pX + loadRadius + 1):
-
+          + ", " + str(world.shape[1]) + " (heights " + str(world.yOrigin) + "-" + str(world.yTop) + "), "
+          + str(numElements))
+    print("block volume: %.1f MB" % (world.nbytes / 1e6))
+
+    regionreader, decodeProcesses, interpreter = chunkReader()
+    try:
+        # Each tile is meshed as soon as its chunks and those round it are in, so with a spiral or nearest-first
+        # order the land near the load position is there first.
+        tileChunks, tilesWaiting = loadarea.tileDependents(loadChunks)
+        if (OPTIONS['newVoxel']):  # new method
+            # FIXME - currently only supported by anvil reader
+            # All chunks are asked for at once, so they're read region by region in the order they're stored
+            # (within windows of the load order, unless it's raster: see loadarea.orderWindow), rather than seeking
+            # around for them one by one.
+            progMax = max(len(loadChunks), 1)
             tChunk0 = datetime.datetime.now()
-            # print('processing '+str(x)+', '+str(z))
-            if (OPTIONS['newVoxel']):  # new method
-
-                # FIXME - currently only supported by anvil reader
-                # regionreader.processChunk2(x,z, blockBuffer, zeroAdjX,
-                # zeroAdjY, zeroAdjZ)
-                regionreader.processChunk2(
-                    x, z, blockBuffer, extraBuffer, zeroAdjX, zeroAdjZ)
+            for chunkPos in regionreader.processChunks2(loadChunks, world, zeroAdjX, zeroAdjZ,
+                                                        decodeProcesses, interpreter, loadarea.orderWindow(loadOrder)):
+                # print('processed '+str(chunkPos))
+                if progCounter % 16 == 0:
+                    wm.progress_update(((progCounter / progMax) / 2) * 100)
+                progCounter += 1
+                for tile in tileChunks.get(chunkPos, ()):
+                    tilesWaiting[tile] -= 1
+                    if tilesWaiting[tile] == 0:
+                        meshTiles(world, [tile], zeroAdjX, zeroAdjZ, WORLD_ROOT)
 
                 tChunk1 = datetime.datetime.now()
 
                 chunkTime = tChunk1 - tChunk0
                 if (OPTIONS['showslimes']):
                     tChunkReadTimes.append(chunkTime.total_seconds())	#tString = "%.2f seconds" % chunkTime.total_seconds()
-    """
+                tChunk0 = tChunk1
+        loadedTimes = dict(zip(loadChunks, regionreader.chunkTimestamps(loadChunks)))
+        recordImport(WORLD_ROOT, worldSelected, loadRadius, pPos, chunks, [loadedTimes.get(chunk, 0) for chunk in chunks])
+        print("Region files: " + regionreader.regions.stats())
+        print("Sections: %d decoded, %d outside the Y limits, %d empty, %d all excluded" % (
+            REPORTING['sectionsdecoded'], REPORTING['sectionsclipped'], REPORTING['sectionsempty'],
+            REPORTING['sectionsexcluded']))
+        """
     if (OPTIONS['showslimes']):
         if slimes.isSlimeSpawn(wseed, x, z):
             slimeLoc = mcToBlendCoord((x, z), (8, 8, 8))  # (8,8,120)
@@ -618,10 +639,15 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
         print("Unknown new Minecraft datablock IDs encountered:")
         print(" ".join(["%d" % bn for bn in unknownBlockIDs]))
 """
-    print("creating clusters")
-    bc = BlockCluster(OPTIONS)
-    bc.create_cluster((blockBuffer, extraBuffer))
-    print("clusters complete")
+        print("creating clusters")
+        # the tiles still waiting on chunks the region files turned out not to have
+        meshTiles(world, sorted(tile for tile, count in tilesWaiting.items() if count > 0), zeroAdjX, zeroAdjZ,
+                  WORLD_ROOT)
+        print("clusters complete")
+    finally:
+        wm.progress_end()
+        regionreader.close()  # done with the region files and the volume, however the import ends
+        world.release()
     # Viewport performance hides:
     if (OPTIONS['fasterViewport']):
         hideIfPresent('mcStone')
@@ -655,6 +681,199 @@ def readMinecraftWorld(self, worldFolder, loadRadius, toggleOptions):
     # Actually: scale world root down to 0.05 by default?
 
 
+def chunkReader(regions=None):
+    """An AnvilChunkReader for the region files in regions (a RegionFilePool; by default, those in the current
+directory), decoding on as many threads as OPTIONS say, and the processes and interpreter to pass its
+processChunks2: (reader, processes, interpreter). Falls back to threads if there's no interpreter for processes."""
+    from .mcanvilreader import AnvilChunkReader
+    decodeThreads = OPTIONS.get('decodeThreads', 1)
+    decodeProcesses = OPTIONS.get('decodeProcesses', 1)
+    interpreter = workerInterpreter() if decodeProcesses > 1 else None
+    if decodeProcesses > 1 and interpreter is None:
+        print("No Python interpreter to start decode processes with: decoding on %d threads instead" % decodeProcesses)
+        decodeThreads, decodeProcesses = max(decodeThreads, decodeProcesses), 1
+    return AnvilChunkReader(regions, threads=decodeThreads), decodeProcesses, interpreter
+
+
+def meshTiles(world, tiles, zeroAdjX, zeroAdjZ, worldRoot):
+    """Meshes the given tiles ((x, z) pairs: see loadarea.TILE_CHUNKS) of a decoded volume, as a cluster per
+block id per tile, parented to worldRoot and tagged with their tile ('mcTile'), so a re-import can replace
+them a tile at a time. Returns the new objects; if meshing stops part way, those already made are removed."""
+    span = loadarea.TILE_CHUNKS * 16
+    objects = []
+    try:
+        for tileX, tileZ in tiles:
+            x0 = (tileX * loadarea.TILE_CHUNKS + zeroAdjX) * 16
+            z0 = (tileZ * loadarea.TILE_CHUNKS + zeroAdjZ) * 16
+            clusters = BlockCluster(OPTIONS).create_cluster(world, (x0, x0 + span), (z0, z0 + span))
+            for cluster in clusters.values():
+                cluster.object.parent = worldRoot
+                cluster.object['mcTile'] = [tileX, tileZ]
+                objects.append(cluster.object)
+    except BaseException:
+        removeObjects(objects)
+        raise
+    return objects
+
+
+def removeObjects(objects):
+    """Deletes objects, and their meshes if nothing else uses them."""
+    for ob in objects:
+        mesh = ob.data if ob.type == 'MESH' else None
+        bpy.data.objects.remove(ob, do_unlink=True)
+        if mesh is not None and mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+
+def workerInterpreter():
+    """The Python interpreter decode worker processes can be started with, or None if there isn't one. In
+Blender, sys.executable is Blender itself; 2.7x builds say where their bundled Python is."""
+    interpreter = getattr(bpy.app, 'binary_path_python', None)
+    if interpreter and os.path.isfile(interpreter):
+        return interpreter
+    if sys.executable and os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    return None
+
+
+def polygonChunks(ob):
+    """The outline of a mesh object (its first face, or failing that its vertices in order) in chunk x, z
+coordinates, as a load area polygon; None if ob isn't a mesh with at least 3 vertices."""
+    if ob is None or ob.type != 'MESH' or len(ob.data.vertices) < 3:
+        print("Load area polygon needs a mesh object selected: loading the square instead.")
+        return None
+    mesh = ob.data
+    indices = list(mesh.polygons[0].vertices) if len(mesh.polygons) > 0 else range(len(mesh.vertices))
+    points = []
+    for i in indices:
+        co = ob.matrix_world * mesh.vertices[i].co
+        # Blender x, y is Minecraft -z, -x (see mcToBlendCoord); 16 blocks to a chunk.
+        points.append((-co[1] / 16, -co[0] / 16))
+    return points
+
+
+def regionDirectory(worldFolder, options):
+    """Where the region files of the dimension options choose are, for a world in the saves folder."""
+    if options['loadnether']:
+        return os.path.join(MCSAVEPATH, worldFolder, "DIM-1", "region")
+    elif options['loadend']:
+        return os.path.join(MCSAVEPATH, worldFolder, "DIM1", "region")
+    return os.path.join(MCSAVEPATH, worldFolder, "region")
+
+
+def worldIndex(worldFolder):
+    """The WorldIndex (which chunks exist) for the region files in the current directory, as readMinecraftWorld
+leaves it: loaded from, and saved back to, a file per world and dimension in the mineblend folder, so only
+region files changed since the last import are looked at."""
+    from .worldindex import WorldIndex
+    dimension = "nether" if OPTIONS['loadnether'] else "end" if OPTIONS['loadend'] else "overworld"
+    indexDir = os.path.join(MCPATH, 'mineblend')
+    indexFile = os.path.join(indexDir, "worldindex-%s-%s.npz" % (worldFolder, dimension))
+    index = WorldIndex.load(os.getcwd(), indexFile)
+    if index.rescanned:
+        try:
+            os.makedirs(indexDir, exist_ok=True)
+            index.save(indexFile)
+        except OSError as e:
+            print("Couldn't save the world index: %s" % e)
+    return index
+
+
+def recordImport(worldRoot, worldFolder, loadRadius, loadCentre, chunks, timestamps):
+    """Stores what was imported, and when each of its chunks was last saved (from the region files' timestamp
+tables), as custom properties of the world root: what changedChunks and reimportMinecraftWorld go by."""
+    options = dict((k, v) for k, v in OPTIONS.items() if isinstance(v, (bool, int, float, str)))
+    if OPTIONS.get('loadPolygon'):
+        options['loadPolygon'] = [float(c) for point in OPTIONS['loadPolygon'] for c in point]  # x, z, x, z...
+    worldRoot['mcImport'] = {
+        'world': worldFolder, 'radius': loadRadius, 'centre': [float(p) for p in loadCentre], 'options': options,
+        'tileChunks': loadarea.TILE_CHUNKS}
+    worldRoot['mcChunks'] = [c for chunk in chunks for c in chunk]  # x, z, x, z...
+    worldRoot['mcChunkTimes'] = list(timestamps)
+
+
+def chunkTimes(worldRoot):
+    """An imported world's chunks (x, z pairs), when each was last saved as of the import, and when each was
+last saved now, going by the region files' timestamp tables: (chunks, before, now)."""
+    from .mcanvilreader import AnvilChunkReader
+    from .regionfile import RegionFilePool
+    info = worldRoot['mcImport']
+    coords = list(worldRoot['mcChunks'])
+    chunks = list(zip(coords[0::2], coords[1::2]))
+    reader = AnvilChunkReader(RegionFilePool(regionDirectory(info['world'], info['options'])))
+    try:
+        times = reader.chunkTimestamps(chunks)
+    finally:
+        reader.close()
+    return chunks, list(worldRoot['mcChunkTimes']), times
+
+
+def changedChunks(worldRoot):
+    """The chunks (x, z pairs) of an imported world that have been saved again since it was imported (or
+appeared or gone since), going by the region files' timestamp tables. None if worldRoot isn't an imported world."""
+    if 'mcImport' not in worldRoot:
+        return None
+    chunks, before, now = chunkTimes(worldRoot)
+    return [chunk for chunk, was, isNow in zip(chunks, before, now) if was != isNow]
+
+
+def reimportMinecraftWorld(self, worldRoot):
+    """Brings an imported world (its root empty being worldRoot) up to date: re-reads just the chunks of the
+mesh tiles (see meshTiles) that have changed chunks, with the same options, and swaps those tiles' objects for
+new ones. Only objects the import made and tagged with a changed tile are removed, and only once their
+replacements have been made. The player marker, mobs and slime chunks are left as they are.
+Returns the changed chunks (none: nothing done); None if worldRoot isn't an imported world, or is one
+imported without tiles."""
+    global EXCLUDED_BLOCKS
+    if 'mcImport' not in worldRoot:
+        return None
+    info = worldRoot['mcImport'].to_dict()
+    if info.get('tileChunks') != loadarea.TILE_CHUNKS:
+        print("%s was imported before it could be re-imported a tile at a time: import it again instead" %
+              worldRoot.name)
+        return None
+    OPTIONS.clear()
+    OPTIONS.update(info['options'])
+    OPTIONS['omitmobs'] = True  # the mobs imported before stay
+    EXCLUDED_BLOCKS[:] = COMMON_BLOCKS if OPTIONS['omitstone'] else []
+
+    chunks, before, now = chunkTimes(worldRoot)
+    changed = [chunk for chunk, was, isNow in zip(chunks, before, now) if was != isNow]
+    if not changed:
+        print("%s: no chunks changed since import" % worldRoot.name)
+        return changed
+    tiles = loadarea.tilesOf(changed)
+    print("%s: %d chunks changed since import, re-importing %d tiles" % (worldRoot.name, len(changed), len(tiles)))
+
+    # The same volume, in the same place, as the import: only the tiles' chunks and those round them are read.
+    from .regionfile import RegionFilePool
+    loadRadius = info['radius']
+    pX, pZ = (int(c) for c in toChunkPos(info['centre'][0], info['centre'][2]))
+    zeroAdjX = -1 * (pX - loadRadius)
+    zeroAdjZ = -1 * (pZ - loadRadius)
+    numElements = (loadRadius * 2 + 1) * 16
+    present = [chunk for chunk, time in zip(chunks, now) if time]
+    reader, processes, interpreter = chunkReader(RegionFilePool(regionDirectory(info['world'], OPTIONS)))
+    world = WorldVolume.forHeights(numElements, numElements, OPTIONS['lowlimit'], OPTIONS['highlimit'],
+                                   OPTIONS.get('sharedVolume', False))
+    try:
+        for chunkPos in reader.processChunks2(loadarea.tileSurroundings(tiles, present), world, zeroAdjX, zeroAdjZ,
+                                              processes, interpreter):
+            pass
+    finally:
+        reader.close()
+    try:
+        replacements = set(meshTiles(world, tiles, zeroAdjX, zeroAdjZ, worldRoot))
+    finally:
+        world.release()
+
+    stale = set(tiles)
+    removeObjects([ob for ob in worldRoot.children
+                   if ob not in replacements and 'mcTile' in ob and tuple(ob['mcTile']) in stale])
+    worldRoot['mcChunkTimes'] = list(now)
+    return changed
+
+
 def blockSurroundedBy(blockAry, blockGroupAry, x, y, z):
     # id = blockAry[x][y][z]
     # if (id in blockGroupAry):
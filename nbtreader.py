@@ -1,7 +1,10 @@
 
 # NBT Reader module
 
-from struct import calcsize, unpack, error as StructError
+from collections.abc import Mapping
+from struct import Struct, error as StructError
+from sys import intern
+import numpy as npy
 
 # An NBT file contains one root TAG_Compound.
 TAG_END = 0
@@ -16,9 +19,15 @@ TAG_STRING = 8
 TAG_LIST = 9
 TAG_COMPOUND = 10
 TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
 
 INDENTCHAR = "  "
 
+# Array tag payloads are numpy views straight onto the (big-endian) NBT bytes; no per-element objects.
+BYTE_ARRAY_DTYPE = npy.dtype('u1')
+INT_ARRAY_DTYPE = npy.dtype('>i4')
+LONG_ARRAY_DTYPE = npy.dtype('>i8')
+
 
 #to read level.dat: compound, long, list short byte. int. ... end.
 
@@ -51,12 +60,139 @@ class TagReader:
         #object type = bleh based on the number 0-255 you just read. Which should be a 10... for TAG_Compound.
 
 
-def readNBT(bstream):
-    rootname, rootTag = TagReader.readNamedTag(bstream)
-    rootTag.name = rootname
+def readNBT(bstream, paths=None, lazy=False, plain=False):
+    """Reads the root tag from an NBT stream (or bytes-like buffer) and returns it.
+The whole stream is read into memory up front and decoded by BufferTagReader, which is a lot
+quicker than TagReader's per-tag stream reads and builds the same tree.
+If paths is given, only those tag paths are decoded (see compilePaths); everything else is skipped.
+If lazy is set, compounds only index their children and decode each one when it's first looked up
+(see LazyCompoundValue), which suits picking a few values out of a big level.dat.
+If plain is set, no Tag objects are built at all: the result is the root's value as native Python values,
+ie dicts for compounds, lists for lists, ints, floats, str, and numpy views for arrays. So
+chunk.value['Level'].value['xPos'].value becomes chunk['Level']['xPos']."""
+    if isinstance(bstream, (bytes, bytearray, memoryview)):
+        data = bstream
+    else:
+        data = bstream.read()
+    return readNBTBuffer(data, paths=paths, lazy=lazy, plain=plain)
+
+
+def iterNBT(bstream):
+    """Walks an NBT stream (or bytes-like buffer) and yields (path, tag type, value or length) events,
+without building a tree. Paths are as in compilePaths ("" for the root, "Level/Sections/Y"...).
+Compounds yield (path, TAG_COMPOUND, None) and lists (path, TAG_LIST, item count) when they start, and
+both yield (path, TAG_END, None) when they finish; list items carry the list's own path. Every other tag
+yields its value, arrays as read-only numpy views. Nesting is tracked on an explicit stack, not by recursion,
+and a stream is read READ_AHEAD bytes at a time with what's been walked past dropped (see _StreamWindow), so
+this runs in about constant memory (a read-ahead block, or the biggest single value if that's bigger) over as
+big a payload as you like (eg to count blocks or scan entities)."""
+    if isinstance(bstream, (bytes, bytearray, memoryview)):
+        window = _StreamWindow(None, bstream)
+    else:
+        window = _StreamWindow(bstream)
+    rootType, pos = window.readByte(0)
+    rootName, pos = window.readName(pos)
+
+    pending = (rootType, "")    # (type, path) of the payload at pos, when one is due
+    stack = []    # open containers: [TAG_COMPOUND, path] or [TAG_LIST, path, item type, items left]
+    while True:
+        if pending is None:
+            if not stack:
+                return
+            frame = stack[-1]
+            if frame[0] == TAG_COMPOUND:
+                readType, pos = window.readByte(pos)
+                if readType == TAG_END:
+                    stack.pop()
+                    yield (frame[1], TAG_END, None)
+                    continue
+                tname, pos = window.readName(pos)
+                pending = (readType, frame[1] + "/" + tname if frame[1] else tname)
+            else:
+                if frame[3] == 0:
+                    stack.pop()
+                    yield (frame[1], TAG_END, None)
+                    continue
+                frame[3] -= 1
+                pending = (frame[2], frame[1])
+
+        tagType, path = pending
+        pending = None
+        if tagType == TAG_COMPOUND:
+            stack.append([TAG_COMPOUND, path])
+            yield (path, TAG_COMPOUND, None)
+        elif tagType == TAG_LIST:
+            (itemType, length), pos = window.unpack(_LISTHEAD, pos)
+            stack.append([TAG_LIST, path, itemType, length])
+            yield (path, TAG_LIST, length)
+        elif tagType in _NUMERICSTRUCTS:
+            (value,), pos = window.unpack(_NUMERICSTRUCTS[tagType], pos)
+            yield (path, tagType, value)
+        elif tagType == TAG_STRING:
+            value, pos = window.readName(pos)
+            yield (path, tagType, value)
+        else:
+            value, pos = window.readArray(pos, _ARRAYDTYPES[tagType])
+            yield (path, tagType, value)
+
+
+READ_AHEAD = 1 << 16  # bytes iterNBT reads from a stream at a time
+
+
+class _StreamWindow:
+    """The part of an NBT stream iterNBT hasn't walked past yet, as a BufferTagReader (.reader) over it, so its
+payload readers can be used on a stream too. Positions are into .reader.data; every read takes one and returns
+the value and the position after it, which may be in a new window: when there aren't enough bytes left for a
+value, the rest of the window is kept, and more of the stream is read onto it (READ_AHEAD bytes at a time, or
+as many as the value needs). With no stream, data is the whole payload and there's never any more."""
+
+    def __init__(self, stream, data=b''):
+        self.stream = stream
+        self.reader = BufferTagReader(data)
+
+    def have(self, pos, n):
+        """The position to read n bytes at pos from, reading more of the stream first if need be."""
+        data = self.reader.data
+        if pos + n <= len(data):
+            return pos
+        parts = [bytes(data[pos:])]
+        got = len(parts[0])
+        while got < n:
+            block = self.stream.read(max(n - got, READ_AHEAD)) if self.stream is not None else b''
+            if not block:
+                raise StructError("NBT data ends part way through a tag")
+            parts.append(block)
+            got += len(block)
+        # (the same reader, over the new window: a new one each time would only go when the garbage collector
+        # got round to it, as its _readers refer back to it. Array views keep the old window alive themselves.)
+        self.reader.data = b''.join(parts)
+        return 0
+
+    def readByte(self, pos):
+        pos = self.have(pos, 1)
+        return self.reader.data[pos], pos + 1
+
+    def unpack(self, struct, pos):
+        pos = self.have(pos, struct.size)
+        return struct.unpack_from(self.reader.data, pos), pos + struct.size
+
+    def readName(self, pos):
+        pos = self.have(pos, _STRLEN.size)
+        pos = self.have(pos, _STRLEN.size + _STRLEN.unpack_from(self.reader.data, pos)[0])
+        return self.reader._readName(pos)
+
+    def readArray(self, pos, dtype):
+        pos = self.have(pos, _ARRAYLEN.size)
+        length = _ARRAYLEN.unpack_from(self.reader.data, pos)[0]
+        pos = self.have(pos, _ARRAYLEN.size + max(length, 0) * dtype.itemsize)
+        return self.reader._readArray(pos, dtype)
+
+
+def readNBTBuffer(data, pos=0, paths=None, lazy=False, plain=False):
+    """Reads the root tag from a bytes-like buffer holding NBT data, starting at pos."""
+    rootname, rootTag, pos = BufferTagReader(data, lazy, plain).readNamedTag(pos, compilePaths(paths))
 
     #check if not at end of string and read more NBT tags if present...?
-    #nfile.close()
     return rootTag
 
 
@@ -111,24 +247,18 @@ class _TAG_Numeric(Tag):
     """parses one of the numeric types (actual type defined by subclass)"""
     #uses struct bitformats (within each subclass) to parse the value from the data stream...
     bitformat = ""    #class, not instance, var.nB: make this something that will crash badly if not overwritten properly!
-
-    def __init__(self, bstream):
-        #if self.bitformat == "":
-        #    print("INCONCEIVABLE!")
-        #    raise NotImplementedError(self.__class__.__name__)
-        #print("fmt is: %s" % self.bitformat)
-        self.size = calcsize(self.bitformat)
-        super(_TAG_Numeric, self).__init__(bstream)
+    struct = None     # precompiled Struct for bitformat, so there's no calcsize/format parse per tag.
 
     def _parseContent(self, bstream):
         #struct parse it using bitformat.
-        self.value = unpack(self.bitformat, bstream.read(self.size))[0]	#[0] because this always returns a tuple
+        self.value = self.struct.unpack(bstream.read(self.struct.size))[0]	#[0] because this always returns a tuple
 
     def __repr__(self):
         return "%d" % self.value
 
 class TAG_Byte(_TAG_Numeric):
     bitformat = ">b"    # class variable, NOT INSTANCE VARIABLE.
+    struct = Struct(bitformat)
     #easy, it's read 1 byte!
     #def __parseContent(self, bstream):
     #    self.value = bstream.read(1)[0]    #grab next 1 byte in stream. That's the TAG_Byte's payload.
@@ -137,17 +267,21 @@ class TAG_Byte(_TAG_Numeric):
 class TAG_Short(_TAG_Numeric):
 #    type = TAG_SHORT
     bitformat = ">h"
+    struct = Struct(bitformat)
 
 class TAG_Int(_TAG_Numeric):
     bitformat = ">i"
+    struct = Struct(bitformat)
 
 class TAG_Long(_TAG_Numeric):
 #    id = TAG_LONG
     bitformat = ">q"
+    struct = Struct(bitformat)
 
 class TAG_Float(_TAG_Numeric):
 #    id = TAG_FLOAT
     bitformat = ">f"
+    struct = Struct(bitformat)
     
     def __repr__(self):
         return "%0.2f" % self.value
@@ -155,6 +289,7 @@ class TAG_Float(_TAG_Numeric):
 class TAG_Double(_TAG_Numeric):
 #    id = TAG_DOUBLE
     bitformat = ">d"
+    struct = Struct(bitformat)
     
     def __repr__(self):
         return "%0.2f" % self.value
@@ -164,7 +299,8 @@ class TAG_Byte_Array(Tag):
     def _parseContent(self, bstream):
         #read the length, then grab the bytes.
         length = TAG_Int(bstream)
-        self.value = bstream.read(length.value)    #read n bytes from the file, where n is the numerical value of the length. Hope this works OK!
+        #read n bytes from the file, where n is the numerical value of the length, and view them as unsigned bytes.
+        self.value = npy.frombuffer(bstream.read(length.value), dtype=BYTE_ARRAY_DTYPE)
 
     def __repr__(self):
         return "[%d bytes array]" % len(self.value)
@@ -251,13 +387,9 @@ class TAG_Compound(Tag):
 class TAG_Int_Array(Tag):
     type = TAG_INT_ARRAY
     def _parseContent(self, bstream):
-        #read the length, then grab the bytes. split those out as 4-byte integers. we hope...
-        tagLen = TAG_Int(bstream)
-        #read out all other values as tag_ints too.
-        ilength = tagLen.value
-        self.value = []
-        for t in range(ilength):
-            self.value.append(TAG_Int(bstream).value)
+        #read the length, then grab the bytes and view those as big-endian 4-byte integers (no TAG_Int per element).
+        ilength = TAG_Int(bstream).value
+        self.value = npy.frombuffer(bstream.read(ilength * 4), dtype=INT_ARRAY_DTYPE)
 
     def __repr__(self):
         #printslist = [str(i) for i in self.value]
@@ -265,8 +397,344 @@ class TAG_Int_Array(Tag):
         #return "[%d ints array] [%s]" % (len(self.value), prout)
         return "[%d ints array]" % len(self.value)
 
+class TAG_Long_Array(Tag):
+    type = TAG_LONG_ARRAY
+    # 1.13+ chunks: BlockStates, Heightmaps... (see sectionreader.unpackBlockStates for the packed block states)
+    def _parseContent(self, bstream):
+        llength = TAG_Int(bstream).value
+        self.value = npy.frombuffer(bstream.read(llength * 8), dtype=LONG_ARRAY_DTYPE)
+
+    def __repr__(self):
+        return "[%d longs array]" % len(self.value)
+
 
 TAGLIST = {TAG_BYTE: TAG_Byte, TAG_SHORT: TAG_Short, TAG_INT: TAG_Int, 
     TAG_LONG:TAG_Long, TAG_FLOAT:TAG_Float, TAG_DOUBLE:TAG_Double, 
     TAG_BYTE_ARRAY:TAG_Byte_Array, TAG_STRING:TAG_String,
-    TAG_LIST: TAG_List, TAG_COMPOUND:TAG_Compound, TAG_INT_ARRAY: TAG_Int_Array}
+    TAG_LIST: TAG_List, TAG_COMPOUND:TAG_Compound, TAG_INT_ARRAY: TAG_Int_Array,
+    TAG_LONG_ARRAY: TAG_Long_Array}
+
+
+# Lengths and type bytes for the buffer decoder. Lengths are prefixed as TAG_Short (strings) or
+# TAG_Int (arrays, lists), but there's no need to build a Tag just to get at them.
+_STRLEN = Struct(">H")
+_ARRAYLEN = Struct(">i")
+_LISTHEAD = Struct(">Bi")
+
+
+# Fixed payload sizes, for skipping tags without decoding them.
+_PAYLOADSIZES = {TAG_END: 0, TAG_BYTE: 1, TAG_SHORT: 2, TAG_INT: 4, TAG_LONG: 8, TAG_FLOAT: 4, TAG_DOUBLE: 8}
+_ITEMSIZES = {TAG_BYTE_ARRAY: 1, TAG_INT_ARRAY: 4, TAG_LONG_ARRAY: 8}
+_NUMERICSTRUCTS = dict((tagType, TAGLIST[tagType].struct) for tagType in _PAYLOADSIZES if tagType != TAG_END)
+_ARRAYDTYPES = {TAG_BYTE_ARRAY: BYTE_ARRAY_DTYPE, TAG_INT_ARRAY: INT_ARRAY_DTYPE, TAG_LONG_ARRAY: LONG_ARRAY_DTYPE}
+
+
+def compilePaths(paths):
+    """Turns an iterable of tag paths to keep, like "Level/Sections/Blocks", into the nested-dict form
+BufferTagReader projects with. Paths are relative to the root compound and list items don't add a path
+step, so "Level/Sections/Y" keeps the Y of every section. A kept path keeps its whole subtree (and the
+compounds leading to it); None (or an already compiled dict) is passed through, None keeping everything."""
+    if paths is None or isinstance(paths, dict):
+        return paths
+    keep = {}
+    for path in paths:
+        node = keep
+        names = [n for n in path.split('/') if n]
+        for name in names[:-1]:
+            child = node.get(name, {})
+            if child is None:    # a shorter path already keeps all of this
+                break
+            node = node.setdefault(name, child)
+        else:
+            node[names[-1]] = None
+    return keep
+
+
+# Every chunk repeats the same few dozen tag names (Level, Sections, Blocks, Y...) and many of the same short
+# strings (entity ids, palette block names). The buffer reader shares one interned str per distinct raw name
+# here, across all the chunks it reads, and skips decoding it again. Bounded, so odd strings can't grow it forever.
+NAMECACHE_SIZE = 4096
+NAMECACHE_MAXLEN = 64
+_nameCache = {}
+
+
+def _makeTag(tagClass, value):
+    """Builds a tag of the given class around an already-decoded value, bypassing the stream parse in Tag.__init__."""
+    tag = tagClass.__new__(tagClass)
+    tag.name = ""
+    tag.value = value
+    return tag
+
+
+class BufferTagReader:
+    """Decodes NBT held in memory (a bytes object or memoryview, eg a decompressed chunk) by walking a
+position cursor over it with precompiled structs. Every payload reader takes the position of the payload
+and returns (tag, position after it). Builds the same tree as TagReader, with no per-tag stream reads.
+Array tags are views onto the buffer, so the buffer stays alive for as long as any of them do.
+In plain mode the readers return bare values instead of tags (see readNBT)."""
+
+    def __init__(self, data, lazy=False, plain=False):
+        if not isinstance(data, bytes):
+            data = memoryview(data).cast('B')
+        self.data = data
+        self.plain = plain
+        if plain:
+            self._readers = {TAG_STRING: self._readName, TAG_LIST: self._readListPlain,
+                TAG_COMPOUND: self._readCompoundLazy if lazy else self._readCompoundPlain}
+            for tagType, dtype in _ARRAYDTYPES.items():
+                self._readers[tagType] = self._plainArrayReader(dtype)
+            for tagType, numeric in _NUMERICSTRUCTS.items():
+                self._readers[tagType] = self._plainNumericReader(numeric)
+            return
+        self._readers = {TAG_STRING: self._readString, TAG_BYTE_ARRAY: self._readByteArray,
+            TAG_INT_ARRAY: self._readIntArray, TAG_LONG_ARRAY: self._readLongArray, TAG_LIST: self._readList,
+            TAG_COMPOUND: self._readCompoundLazy if lazy else self._readCompound}
+        for tagType in (TAG_BYTE, TAG_SHORT, TAG_INT, TAG_LONG, TAG_FLOAT, TAG_DOUBLE):
+            self._readers[tagType] = self._numericReader(TAGLIST[tagType])
+
+    def readNamedTag(self, pos=0, keep=None):
+        """Reads a named tag at pos. Returns a tuple of (name, tag, pos after the tag).
+keep is a compiled projection (see compilePaths) applied below this tag; None decodes everything."""
+        tagType = self.data[pos]
+        name, pos = self._readName(pos + 1)
+        tag, pos = self._readProjected(tagType, pos, keep)
+        if not self.plain:
+            tag.name = name
+        return (name, tag, pos)
+
+    def _readProjected(self, tagType, pos, keep):
+        if keep is None:
+            return self._readers[tagType](pos)
+        if tagType == TAG_COMPOUND:
+            return self._readCompoundProjected(pos, keep)
+        if tagType == TAG_LIST:
+            return self._readListProjected(pos, keep)
+        return self._readers[tagType](pos)
+
+    def skipPayload(self, tagType, pos):
+        """Returns the position just past the payload of type tagType at pos, without building anything."""
+        data = self.data
+        if tagType in _PAYLOADSIZES:
+            return pos + _PAYLOADSIZES[tagType]
+        if tagType == TAG_STRING:
+            return pos + 2 + _STRLEN.unpack_from(data, pos)[0]
+        if tagType in _ITEMSIZES:
+            return pos + 4 + _ARRAYLEN.unpack_from(data, pos)[0] * _ITEMSIZES[tagType]
+        if tagType == TAG_LIST:
+            tagId, length = _LISTHEAD.unpack_from(data, pos)
+            pos += 5
+            if tagId in _PAYLOADSIZES:
+                return pos + length * _PAYLOADSIZES[tagId]
+            for t in range(length):
+                pos = self.skipPayload(tagId, pos)
+            return pos
+        if tagType == TAG_COMPOUND:
+            readType = data[pos]
+            pos += 1
+            while readType != TAG_END:
+                pos += 2 + _STRLEN.unpack_from(data, pos)[0]
+                pos = self.skipPayload(readType, pos)
+                readType = data[pos]
+                pos += 1
+            return pos
+        raise KeyError(tagType)
+
+    def _readName(self, pos):
+        """Reads a string (a tag name or TAG_String payload). Short ones go through the name cache."""
+        data = self.data
+        length = _STRLEN.unpack_from(data, pos)[0]
+        pos += 2
+        end = pos + length
+        if end > len(data):
+            raise StructError("string runs past end of NBT data")
+        raw = data[pos:end]
+        if length > NAMECACHE_MAXLEN:
+            return str(raw, 'utf-8'), end
+        if not isinstance(raw, bytes):
+            raw = bytes(raw)
+        name = _nameCache.get(raw)
+        if name is None:
+            name = str(raw, 'utf-8')
+            if len(_nameCache) < NAMECACHE_SIZE:  # only what's cached is interned: a full cache interns nothing
+                name = _nameCache[raw] = intern(name)
+        return name, end
+
+    def _numericReader(self, tagClass):
+        data = self.data
+        unpackFrom = tagClass.struct.unpack_from
+        size = tagClass.struct.size
+
+        def readNumeric(pos):
+            return _makeTag(tagClass, unpackFrom(data, pos)[0]), pos + size
+        return readNumeric
+
+    def _plainNumericReader(self, numeric):
+        data = self.data
+        unpackFrom = numeric.unpack_from
+        size = numeric.size
+
+        def readNumeric(pos):
+            return unpackFrom(data, pos)[0], pos + size
+        return readNumeric
+
+    def _plainArrayReader(self, dtype):
+        def readArray(pos):
+            return self._readArray(pos, dtype)
+        return readArray
+
+    def _readString(self, pos):
+        value, pos = self._readName(pos)
+        return _makeTag(TAG_String, value), pos
+
+    def _readArray(self, pos, dtype):
+        """Returns a read-only numpy view of the array payload at pos over the decoded buffer (no copy), and the position after it."""
+        length = _ARRAYLEN.unpack_from(self.data, pos)[0]
+        pos += 4
+        end = pos + length * dtype.itemsize
+        if end > len(self.data):
+            raise StructError("array runs past end of NBT data")
+        view = npy.frombuffer(self.data, dtype=dtype, count=length, offset=pos)
+        view.flags.writeable = False
+        return view, end
+
+    def _readByteArray(self, pos):
+        value, pos = self._readArray(pos, BYTE_ARRAY_DTYPE)
+        return _makeTag(TAG_Byte_Array, value), pos
+
+    def _readIntArray(self, pos):
+        value, pos = self._readArray(pos, INT_ARRAY_DTYPE)
+        return _makeTag(TAG_Int_Array, value), pos
+
+    def _readLongArray(self, pos):
+        value, pos = self._readArray(pos, LONG_ARRAY_DTYPE)
+        return _makeTag(TAG_Long_Array, value), pos
+
+    def _readList(self, pos):
+        tagId, length = _LISTHEAD.unpack_from(self.data, pos)
+        pos += 5
+        items = []
+        if length > 0:
+            readPayload = self._readers[tagId]
+            for t in range(length):
+                item, pos = readPayload(pos)
+                items.append(item)
+        return _makeTag(TAG_List, items), pos
+
+    def _readCompound(self, pos):
+        data = self.data
+        readers = self._readers
+        value = {}
+        readType = data[pos]
+        pos += 1
+        while readType != TAG_END:
+            tname, pos = self._readName(pos)
+            payload, pos = readers[readType](pos)
+            payload.name = tname
+            value[tname] = payload
+            readType = data[pos]
+            pos += 1
+        return _makeTag(TAG_Compound, value), pos
+
+    def _readCompoundLazy(self, pos):
+        data = self.data
+        index = {}
+        readType = data[pos]
+        pos += 1
+        while readType != TAG_END:
+            tname, pos = self._readName(pos)
+            index[tname] = (readType, pos)
+            pos = self.skipPayload(readType, pos)
+            readType = data[pos]
+            pos += 1
+        if self.plain:
+            return LazyCompoundValue(self, index), pos
+        return _makeTag(TAG_Compound, LazyCompoundValue(self, index)), pos
+
+    def _readListPlain(self, pos):
+        tagId, length = _LISTHEAD.unpack_from(self.data, pos)
+        pos += 5
+        items = []
+        if length > 0:
+            readPayload = self._readers[tagId]
+            for t in range(length):
+                item, pos = readPayload(pos)
+                items.append(item)
+        return items, pos
+
+    def _readCompoundPlain(self, pos):
+        data = self.data
+        readers = self._readers
+        readName = self._readName
+        value = {}
+        readType = data[pos]
+        pos += 1
+        while readType != TAG_END:
+            tname, pos = readName(pos)
+            value[tname], pos = readers[readType](pos)
+            readType = data[pos]
+            pos += 1
+        return value, pos
+
+    def _readListProjected(self, pos, keep):
+        tagId, length = _LISTHEAD.unpack_from(self.data, pos)
+        if tagId not in (TAG_COMPOUND, TAG_LIST):
+            return self._readers[TAG_LIST](pos)
+        pos += 5
+        items = []
+        for t in range(length):
+            item, pos = self._readProjected(tagId, pos, keep)
+            items.append(item)
+        if self.plain:
+            return items, pos
+        return _makeTag(TAG_List, items), pos
+
+    def _readCompoundProjected(self, pos, keep):
+        data = self.data
+        plain = self.plain
+        value = {}
+        readType = data[pos]
+        pos += 1
+        while readType != TAG_END:
+            tname, pos = self._readName(pos)
+            if tname in keep:
+                payload, pos = self._readProjected(readType, pos, keep[tname])
+                if not plain:
+                    payload.name = tname
+                value[tname] = payload
+            else:
+                pos = self.skipPayload(readType, pos)
+            readType = data[pos]
+            pos += 1
+        if plain:
+            return value, pos
+        return _makeTag(TAG_Compound, value), pos
+
+
+class LazyCompoundValue(Mapping):
+    """The value of a lazily read TAG_Compound. Reading the compound only records each child's name, type
+and payload position; a child is decoded (and kept) the first time it's looked up by name. Otherwise it
+behaves like the usual dict of name -> tag (or name -> value, in plain mode), for 'in', keys() and so on."""
+
+    def __init__(self, reader, index):
+        self._reader = reader
+        self._index = index    # name -> (tag type, payload position)
+        self._tags = {}
+
+    def __getitem__(self, name):
+        tag = self._tags.get(name)
+        if tag is None:
+            tagType, pos = self._index[name]
+            tag = self._reader._readers[tagType](pos)[0]
+            if not self._reader.plain:
+                tag.name = name
+            self._tags[name] = tag
+        return tag
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,186 @@
+# NBT Writer module: the other half of nbtreader.
+
+from collections.abc import Mapping
+from struct import Struct
+import numpy as npy
+
+from .nbtreader import (TAG_END, TAG_BYTE, TAG_SHORT, TAG_INT, TAG_LONG, TAG_FLOAT, TAG_DOUBLE,
+    TAG_BYTE_ARRAY, TAG_STRING, TAG_LIST, TAG_COMPOUND, TAG_INT_ARRAY, TAG_LONG_ARRAY,
+    TAGLIST, Tag, BYTE_ARRAY_DTYPE, INT_ARRAY_DTYPE, LONG_ARRAY_DTYPE)
+
+# Writes either a TAG_* tree (as nbtreader builds it) or plain Python values. Plain values have no NBT
+# type of their own, so one is picked for them:
+#   bool, int -> TAG_Int (TAG_Long if it won't fit)    float -> TAG_Double    str -> TAG_String
+#   bytes, 1-byte numpy arrays -> TAG_Byte_Array    4/8-byte integer numpy arrays -> TAG_Int/Long_Array
+#   dict (any Mapping) -> TAG_Compound    list, tuple -> TAG_List (of the first item's type)
+# Tags found inside plain values (and vice versa) are fine.
+
+_TAGTYPES = dict((tagClass, tagType) for tagType, tagClass in TAGLIST.items())
+
+_NUMERICSTRUCTS = dict((tagType, TAGLIST[tagType].struct)
+    for tagType in (TAG_BYTE, TAG_SHORT, TAG_INT, TAG_LONG, TAG_FLOAT, TAG_DOUBLE))
+_ARRAYDTYPES = {TAG_BYTE_ARRAY: BYTE_ARRAY_DTYPE, TAG_INT_ARRAY: INT_ARRAY_DTYPE, TAG_LONG_ARRAY: LONG_ARRAY_DTYPE}
+_STRLEN = Struct(">H")
+_ARRAYLEN = Struct(">i")
+_LISTHEAD = Struct(">Bi")
+
+
+def tagTypeOf(value):
+    """The NBT tag type value will be written as (see the table at the top of this module)."""
+    if isinstance(value, Tag):
+        return _TAGTYPES[value.__class__]
+    if isinstance(value, (bool, int, npy.integer)):
+        return TAG_INT if -0x80000000 <= value <= 0x7fffffff else TAG_LONG
+    if isinstance(value, (float, npy.floating)):
+        return TAG_DOUBLE
+    if isinstance(value, str):
+        return TAG_STRING
+    if isinstance(value, (bytes, bytearray)):
+        return TAG_BYTE_ARRAY
+    if isinstance(value, npy.ndarray):
+        if value.dtype.itemsize == 1:
+            return TAG_BYTE_ARRAY
+        if value.dtype.kind in 'iu' and value.dtype.itemsize in (4, 8):
+            return TAG_INT_ARRAY if value.dtype.itemsize == 4 else TAG_LONG_ARRAY
+    elif isinstance(value, Mapping):
+        return TAG_COMPOUND
+    elif isinstance(value, (list, tuple)):
+        return TAG_LIST
+    raise TypeError("No NBT tag type for %r" % type(value))
+
+
+def _writeName(write, name):
+    encoded = name.encode('utf-8')
+    write(_STRLEN.pack(len(encoded)))
+    write(encoded)
+
+
+def _writeListHead(write, items):
+    itemType = tagTypeOf(items[0]) if len(items) > 0 else TAG_END
+    write(_LISTHEAD.pack(itemType, len(items)))
+    return itemType
+
+
+def _writePayload(write, tagType, value):
+    """Writes the payload of a tag of type tagType holding value (a Tag or a plain value)."""
+    if isinstance(value, Tag):
+        value = value.value
+    if tagType in _NUMERICSTRUCTS:
+        write(_NUMERICSTRUCTS[tagType].pack(value))
+    elif tagType == TAG_STRING:
+        _writeName(write, value)
+    elif tagType in _ARRAYDTYPES:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = npy.frombuffer(value, dtype=BYTE_ARRAY_DTYPE)
+        write(_ARRAYLEN.pack(len(value)))
+        write(npy.asarray(value).astype(_ARRAYDTYPES[tagType], copy=False).tobytes())
+    elif tagType == TAG_LIST:
+        itemType = _writeListHead(write, value)
+        for item in value:
+            if tagTypeOf(item) != itemType:
+                raise TypeError("TAG_List items must all be the same type")
+            _writePayload(write, itemType, item)
+    elif tagType == TAG_COMPOUND:
+        for name, child in value.items():
+            childType = tagTypeOf(child)
+            write(bytes((childType,)))
+            _writeName(write, name)
+            _writePayload(write, childType, child)
+        write(b'\x00')
+    else:
+        raise KeyError(tagType)
+
+
+def writeNBT(bstream, tag, name=None, tagType=None):
+    """Writes tag (a TAG_* tree, or plain values) to bstream as a named NBT tag, the way readNBT reads one back.
+The name defaults to the tag's own name (blank for plain values); tagType overrides the type picked for plain values."""
+    if name is None:
+        name = tag.name if isinstance(tag, Tag) else ""
+    if tagType is None:
+        tagType = tagTypeOf(tag)
+    write = bstream.write
+    write(bytes((tagType,)))
+    _writeName(write, name)
+    _writePayload(write, tagType, tag)
+
+
+def toNBTBytes(tag, name=None, tagType=None):
+    """Returns tag written out as NBT bytes (see writeNBT)."""
+    chunks = []
+    writeNBT(_ChunkSink(chunks), tag, name, tagType)
+    return b''.join(chunks)
+
+
+class _ChunkSink:
+    def __init__(self, chunks):
+        self.write = chunks.append
+
+
+class NBTWriter:
+    """Writes NBT to a stream a piece at a time, so large compounds and lists never need to be built in memory
+first. Open compounds and lists with beginCompound/beginList, add complete tags with write, and close with end:
+
+    w = NBTWriter(outfile)
+    w.beginCompound()                       # the root
+    w.beginList("Sections", TAG_COMPOUND)
+    for section in sections:
+        w.write(section)                    # names are ignored inside lists
+    w.end()
+    w.end()
+
+A list's length can be given up front; otherwise it's patched in on end(), which needs a seekable stream."""
+
+    def __init__(self, bstream):
+        self.bstream = bstream
+        self._write = bstream.write
+        self._open = []    # [TAG_COMPOUND] or [TAG_LIST, item type, declared length, items written, length pos]
+
+    def _startTag(self, name, tagType):
+        """Writes whatever precedes a payload at this point: type and name in a compound (or at the root),
+or nothing in a list (after checking the item type)."""
+        if self._open and self._open[-1][0] == TAG_LIST:
+            frame = self._open[-1]
+            if tagType != frame[1]:
+                raise TypeError("This TAG_List holds type %d, not %d" % (frame[1], tagType))
+            frame[3] += 1
+        else:
+            self._write(bytes((tagType,)))
+            _writeName(self._write, name)
+
+    def write(self, value, name="", tagType=None):
+        """Writes one complete tag (a TAG_* tree or plain value) into the open compound or list.
+Inside a list, plain values are written as the list's item type unless tagType says otherwise."""
+        if tagType is None:
+            if self._open and self._open[-1][0] == TAG_LIST and not isinstance(value, Tag):
+                tagType = self._open[-1][1]
+            else:
+                tagType = tagTypeOf(value)
+        if isinstance(value, Tag) and not name:
+            name = value.name
+        self._startTag(name, tagType)
+        _writePayload(self._write, tagType, value)
+
+    def beginCompound(self, name=""):
+        self._startTag(name, TAG_COMPOUND)
+        self._open.append([TAG_COMPOUND])
+
+    def beginList(self, name, itemType, length=None):
+        self._startTag(name, TAG_LIST)
+        lengthPos = None
+        if length is None:
+            lengthPos = self.bstream.tell() + 1
+        self._write(_LISTHEAD.pack(itemType, length or 0))
+        self._open.append([TAG_LIST, itemType, length, 0, lengthPos])
+
+    def end(self):
+        """Closes the innermost open compound or list."""
+        frame = self._open.pop()
+        if frame[0] == TAG_COMPOUND:
+            self._write(b'\x00')
+        elif frame[2] is None:
+            endPos = self.bstream.tell()
+            self.bstream.seek(frame[4])
+            self._write(_ARRAYLEN.pack(frame[3]))
+            self.bstream.seek(endPos)
+        elif frame[3] != frame[2]:
+            raise ValueError("TAG_List declared %d items but %d were written" % (frame[2], frame[3]))
@@ -0,0 +1,294 @@
+# Region file module: random access to the chunks stored in a McRegion (.mcr) or Anvil (.mca) file.
+# Doesn't need Blender.
+
+import mmap
+import os
+import zlib
+from collections import OrderedDict
+from struct import Struct
+
+import numpy as npy
+
+try:
+    import lz4.block as lz4block  # optional: only needed for LZ4-compressed chunks
+except ImportError:
+    lz4block = None
+
+SECTOR_BYTES = 4096  # region files are laid out in 4 kiB sectors
+HEADER_BYTES = 2 * SECTOR_BYTES  # 1024 chunk locations, then 1024 timestamps
+
+# Chunk compression type bytes
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+COMPRESSION_EXTERNAL = 128  # flag: the chunk was too big for the region file, and is in c.<x>.<z>.mcc beside it
+
+# LZ4 chunks are in lz4-java's LZ4BlockOutputStream format: blocks of magic, token, compressed length,
+# decompressed length and checksum, then the data. The last block is empty.
+_LZ4_MAGIC = b'LZ4Block'
+_LZ4_HEADER = Struct("<Biii")
+_LZ4_RAW = 0x10
+_LZ4_COMPRESSED = 0x20
+
+COALESCE_BYTES = 1 << 20  # largest single read chunkPayloads will merge adjacent chunks into
+MAX_OPEN_REGIONS = 64  # region files a RegionFilePool keeps open (each is a file handle and a mapping)
+
+
+def regionFileName(regionX, regionZ, ext="mca"):
+    return "r.%d.%d.%s" % (regionX, regionZ, ext)
+
+
+def regionOf(chunkX, chunkZ):
+    """The (x, z) of the region holding a chunk: floor of chunk coords over 32."""
+    return (chunkX >> 5, chunkZ >> 5)
+
+
+def regionGroups(chunks, window=None):
+    """chunks (x, z pairs) grouped by region, as a list of ((regionX, regionZ), chunks) in the order of each
+group's first chunk. With a window, only each run of that many chunks is grouped, so the groups keep to
+the order chunks were asked for (eg nearest first) within a window, rather than a region at a time."""
+    if not window:
+        window = max(len(chunks), 1)
+    groups = []
+    for start in range(0, len(chunks), window):
+        byRegion = {}
+        for chunkX, chunkZ in chunks[start:start + window]:
+            byRegion.setdefault(regionOf(chunkX, chunkZ), []).append((chunkX, chunkZ))
+        groups.extend(byRegion.items())
+    return groups
+
+
+def externalChunkFileName(chunkX, chunkZ):
+    return "c.%d.%d.mcc" % (chunkX, chunkZ)
+
+
+def decompressChunk(compression, data):
+    """Decompresses a chunk's stored data (a bytes-like object) according to its compression type byte.
+Uncompressed data is handed back as it is, without a copy."""
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if compression == COMPRESSION_NONE:
+        return data
+    if compression == COMPRESSION_LZ4:
+        return _decompressLZ4(data)
+    if compression == COMPRESSION_GZIP:
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)  # gzip header and trailer, without going via gzip.GzipFile
+    raise ValueError("Unsupported chunk compression type: %d" % compression)
+
+
+def _decompressLZ4(data):
+    data = memoryview(data)
+    pieces = []
+    pos = 0
+    while pos < len(data):
+        if data[pos:pos + 8] != _LZ4_MAGIC:
+            raise ValueError("Bad LZ4 block at %d" % pos)
+        token, compressedLength, length, checksum = _LZ4_HEADER.unpack_from(data, pos + 8)
+        pos += 8 + _LZ4_HEADER.size
+        if length == 0:
+            break
+        block = data[pos:pos + compressedLength]
+        pos += compressedLength
+        method = token & 0xf0
+        if method == _LZ4_RAW:
+            pieces.append(bytes(block))
+        elif method == _LZ4_COMPRESSED:
+            if lz4block is None:
+                raise ValueError("LZ4-compressed chunk, but the lz4 module isn't installed")
+            pieces.append(lz4block.decompress(block, uncompressed_size=length))
+        else:
+            raise ValueError("Bad LZ4 block method: %#x" % method)
+    return b''.join(pieces)
+
+
+class RegionFile:
+    """A region file, memory-mapped once. Its header's 1024 chunk locations and timestamps are parsed up front
+into numpy arrays (indexed by (x mod 32) + (z mod 32) * 32), so finding a chunk needs no further I/O and
+chunk payloads come straight out of the map as memoryview slices.
+Slices handed out are only good until close()."""
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self._file = open(fileName, 'rb')
+        self._map = None
+        self.data = memoryview(b'')
+        header = npy.zeros(2 * 1024, dtype=npy.uint32)
+        if os.fstat(self._file.fileno()).st_size >= HEADER_BYTES:  # a new region file can still be empty
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = memoryview(self._map)
+            header = npy.frombuffer(self._map, dtype='>u4', count=2 * 1024).astype(npy.uint32)
+        # Location: 3 bytes of sector offset from the start of the file, 1 byte of sector count.
+        self.offsets = header[:1024] >> 8
+        self.sectorCounts = header[:1024] & 0xff
+        # Last-modified time of each chunk, in seconds since the epoch.
+        self.timestamps = header[1024:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass    # a payload slice is still alive; the map goes when that does.
+            self._map = None
+        self._file.close()
+
+    def chunkIndex(chunkX, chunkZ):
+        return (chunkX & 31) + (chunkZ & 31) * 32
+
+    def hasChunk(self, chunkX, chunkZ):
+        return self.offsets[RegionFile.chunkIndex(chunkX, chunkZ)] != 0
+
+    def chunkTimestamp(self, chunkX, chunkZ):
+        return int(self.timestamps[RegionFile.chunkIndex(chunkX, chunkZ)])
+
+    def chunkPayload(self, chunkX, chunkZ):
+        """Returns (compression type, memoryview of the stored chunk data) for a chunk, or None if the chunk
+has never been generated. Chunk data starts with a 4-byte length (of what follows) and 1 compression type byte.
+Chunks stored outside the region file (in a .mcc file) are read from there."""
+        offset = int(self.offsets[RegionFile.chunkIndex(chunkX, chunkZ)])
+        if offset == 0:
+            return None
+        return self._external(chunkX, chunkZ, RegionFile._payloadAt(self.data, offset * SECTOR_BYTES))
+
+    def _external(self, chunkX, chunkZ, payload):
+        """Swaps the stub payload of an oversized chunk for the contents of its .mcc file."""
+        if payload is None or not payload[0] & COMPRESSION_EXTERNAL:
+            return payload
+        mccName = os.path.join(os.path.dirname(self.fileName), externalChunkFileName(chunkX, chunkZ))
+        if not os.path.exists(mccName):
+            return None
+        with open(mccName, 'rb') as mcc:
+            return (payload[0] & ~COMPRESSION_EXTERNAL, memoryview(mcc.read()))
+
+    def _payloadAt(data, start):
+        length = int.from_bytes(data[start:start + 4], 'big')
+        end = start + 4 + length
+        if length == 0 or end > len(data):
+            return None    # truncated or corrupt
+        return (data[start + 4], data[start + 5:end])
+
+    def chunkPayloads(self, chunks):
+        """Yields (chunkX, chunkZ, payload) for each chunk of chunks (x, z pairs) that is in this region, payload
+being as chunkPayload returns it. Chunks come in the order they're stored, not the order asked for, and runs of
+adjacent ones are fetched with one read of up to COALESCE_BYTES, so a whole region is a few sequential reads
+instead of a seek per chunk. Payloads are copies, good after close()."""
+        located = []
+        for chunkX, chunkZ in chunks:
+            i = RegionFile.chunkIndex(chunkX, chunkZ)
+            if self.offsets[i] != 0:
+                located.append((int(self.offsets[i]), max(1, int(self.sectorCounts[i])), chunkX, chunkZ))
+        located.sort()
+
+        runStart = 0
+        while runStart < len(located):
+            # grow the run while the next chunk starts where (or before) this run ends
+            firstSector = located[runStart][0]
+            lastSector = firstSector + located[runStart][1]
+            runEnd = runStart + 1
+            while runEnd < len(located) and located[runEnd][0] <= lastSector and \
+                    (located[runEnd][0] + located[runEnd][1] - firstSector) * SECTOR_BYTES <= COALESCE_BYTES:
+                lastSector = max(lastSector, located[runEnd][0] + located[runEnd][1])
+                runEnd += 1
+
+            block = self._readSectors(firstSector, lastSector)
+            for offset, count, chunkX, chunkZ in located[runStart:runEnd]:
+                payload = self._external(chunkX, chunkZ,
+                                         RegionFile._payloadAt(block, (offset - firstSector) * SECTOR_BYTES))
+                if payload is not None:
+                    yield (chunkX, chunkZ, payload)
+            runStart = runEnd
+
+    def _readSectors(self, firstSector, lastSector):
+        """One read of sectors firstSector up to (not including) lastSector, as a memoryview."""
+        start = firstSector * SECTOR_BYTES
+        end = min(lastSector * SECTOR_BYTES, len(self.data))
+        if start >= end:
+            return memoryview(b'')
+        if hasattr(mmap, 'MADV_WILLNEED'):  # Python 3.8+, and not on every platform
+            alignedStart = start - start % mmap.PAGESIZE
+            self._map.madvise(mmap.MADV_WILLNEED, alignedStart, end - alignedStart)
+        return memoryview(bytes(self.data[start:end]))
+
+    def readChunkData(self, chunkX, chunkZ):
+        """Returns a chunk's decompressed NBT bytes, or None if it's not there."""
+        payload = self.chunkPayload(chunkX, chunkZ)
+        if payload is None:
+            return None
+        return decompressChunk(*payload)
+
+
+class RegionFilePool:
+    """The region files of a world, opened on demand and shared by whatever reads chunks from it. At most maxOpen
+are kept open: past that, the least recently used one is closed (and reopened, header and all, if it's wanted
+again). Regions found not to exist are remembered, so they aren't looked for again.
+hits, misses and evictions count how well the cap suits the load; close() everything when the import is done."""
+
+    def __init__(self, directory="", maxOpen=MAX_OPEN_REGIONS):
+        self.directory = directory
+        self.maxOpen = max(1, maxOpen)
+        self._open = OrderedDict()  # file name -> RegionFile, least recently used first
+        self._missing = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._open)
+
+    def regionFile(self, regionX, regionZ, ext="mca"):
+        """Returns the RegionFile for region regionX, regionZ, or None if that region hasn't been generated."""
+        fileName = os.path.join(self.directory, regionFileName(regionX, regionZ, ext))
+        region = self._open.get(fileName)
+        if region is not None:
+            self.hits += 1
+            self._open.move_to_end(fileName)
+            return region
+        if fileName in self._missing:
+            self.hits += 1
+            return None
+        self.misses += 1
+        if not os.path.exists(fileName):
+            # Can't load: it doesn't exist!
+            print("No such region generated.")
+            self._missing.add(fileName)
+            return None
+        while len(self._open) >= self.maxOpen:
+            self._open.popitem(last=False)[1].close()
+            self.evictions += 1
+        region = RegionFile(fileName)
+        self._open[fileName] = region
+        return region
+
+    def close(self):
+        """Closes every open region file. The pool can still be used afterwards (they'll be reopened)."""
+        while self._open:
+            self._open.popitem()[1].close()
+        self._missing.clear()
+
+    def stats(self):
+        return "%d hits, %d misses, %d evictions (%d open, cap %d)" % (
+            self.hits, self.misses, self.evictions, len(self._open), self.maxOpen)
+
+    def chunkPayloads(self, chunks, ext="mca", window=None):
+        """Yields (chunkX, chunkZ, payload) for those of chunks (x, z pairs) that exist, a region at a time and in
+file order within each (see RegionFile.chunkPayloads). Regions come in the order of their first chunk in
+chunks. With a window, that's done for each run of window chunks in turn (see regionGroups), so the order
+chunks were asked in is kept to within a window, at the cost of shorter runs of sequential reads."""
+        for (regionX, regionZ), regionChunks in regionGroups(chunks, window):
+            region = self.regionFile(regionX, regionZ, ext)
+            if region is not None:
+                yield from region.chunkPayloads(regionChunks)
@@ -0,0 +1,102 @@
+# Section reader module: vectorised (numpy) decoding of Anvil chunk sections.
+# Nothing in here needs Blender, so it can be used outside it too.
+
+import numpy as npy
+
+from . import blockregistry
+
+SECTION_BLOCKS = 4096  # a section is 16x16x16 blocks, indexed (y * 16 + z) * 16 + x
+
+
+def blockStateBits(paletteSize):
+    """Bits per entry in a section's packed BlockStates, for a palette of the given size (never less than 4)."""
+    return max(4, (paletteSize - 1).bit_length())
+
+
+def unpackBlockStates(blockStates, paletteSize, spanning=None):
+    """Unpacks a 1.13+ section's BlockStates longs (eg a TAG_Long_Array value) into 4096 palette indices at once.
+Returns a uint16 array in section (YZX) order.
+
+Entries are packed from the low bit of each long upward. Before 1.16 they run on across long boundaries
+('spanning'); from 1.16 each long holds floor(64 / bits) entries and the leftover high bits are padding.
+The layout is worked out from the number of longs unless spanning is given (when bits divides 64 both
+layouts are the same anyway)."""
+    bits = blockStateBits(paletteSize)
+    longs = npy.asarray(blockStates, dtype='>i8')
+    perLong = 64 // bits
+    spanningCount = SECTION_BLOCKS * bits // 64
+    paddedCount = -(-SECTION_BLOCKS // perLong)
+    if spanning is None:
+        if len(longs) == spanningCount:
+            spanning = True
+        elif len(longs) == paddedCount:
+            spanning = False
+        else:
+            raise ValueError("%d BlockStates longs doesn't fit a %d-entry palette (%d bits per entry)" %
+                (len(longs), paletteSize, bits))
+    expected = spanningCount if spanning else paddedCount
+    if len(longs) < expected:
+        raise ValueError("expected %d BlockStates longs, got %d" % (expected, len(longs)))
+
+    # As little-endian bytes, unpacking bits low-first lays every long out from bit 0 to bit 63 in turn.
+    bitstream = npy.unpackbits(longs[:expected].view('>u8').astype('<u8').view(npy.uint8), bitorder='little')
+    if spanning:
+        entryBits = bitstream[:SECTION_BLOCKS * bits].reshape(SECTION_BLOCKS, bits)
+    else:
+        entryBits = bitstream.reshape(expected, 64)[:, :perLong * bits].reshape(-1, bits)[:SECTION_BLOCKS]
+    weights = npy.left_shift(1, npy.arange(bits, dtype=npy.uint16), dtype=npy.uint16)
+    return entryBits.dot(weights).astype(npy.uint16, copy=False)
+
+
+def paletteTable(palette, lookup=blockregistry.paletteEntryIDs):
+    """The (id, meta) of each entry of a section's palette (a list of (name, properties) pairs), as a
+(len(palette), 2) uint16 array. Unknown blocks map to air."""
+    table = npy.zeros((len(palette), 2), dtype=npy.uint16)
+    for i, (name, properties) in enumerate(palette):
+        ids = lookup(name, properties)
+        if ids is not None:
+            table[i] = ids
+    return table
+
+
+def decodePaletteSection(palette, blockStates, lookup=blockregistry.paletteEntryIDs, table=None):
+    """Decodes a palette-format (1.13+) section to the same (id, meta) data legacy Blocks/Data sections hold.
+palette is a list of (name, properties) pairs and blockStates the section's packed longs. Each palette entry
+is mapped through lookup once (or pass in its paletteTable, if it's been made already); then one gather over
+the unpacked indices gives the whole section.
+Returns (ids, metas): uint16 and uint8 arrays of 4096 in section order. Unknown blocks come out as air."""
+    if table is None:
+        table = paletteTable(palette, lookup)
+    if len(palette) == 1:
+        indices = npy.zeros(SECTION_BLOCKS, dtype=npy.uint16)
+    else:
+        indices = unpackBlockStates(blockStates, len(palette))
+    sectionIDs = table[indices]
+    return sectionIDs[:, 0], sectionIDs[:, 1].astype(npy.uint8)
+
+
+def unpackNibbles(nibbles):
+    """Unpacks a 4-bit-per-block array (a legacy section's Data, Add, BlockLight or SkyLight: two blocks to
+a byte, low nibble first) into one uint8 value per block."""
+    packed = npy.frombuffer(nibbles, dtype=npy.uint8) if isinstance(nibbles, (bytes, bytearray, memoryview)) \
+        else npy.asarray(nibbles, dtype=npy.uint8)
+    values = npy.empty(len(packed) * 2, dtype=npy.uint8)
+    values[0::2] = packed & 0x0f
+    values[1::2] = packed >> 4
+    return values
+
+
+def decodeLegacySection(blocks, add=None, data=None):
+    """Decodes a legacy (pre-1.13) section: Blocks (8 low bits of each id), and Add (4 high bits of each id,
+if there is one) and Data (4-bit data values), all in section order. Returns (ids, metas) like
+decodePaletteSection: uint16 and uint8 arrays of 4096."""
+    ids = npy.frombuffer(blocks, dtype=npy.uint8) if isinstance(blocks, (bytes, bytearray, memoryview)) \
+        else npy.asarray(blocks, dtype=npy.uint8)
+    ids = ids[:SECTION_BLOCKS].astype(npy.uint16)
+    if add is not None:
+        ids |= unpackNibbles(add)[:SECTION_BLOCKS].astype(npy.uint16) << 8
+    if data is not None:
+        metas = unpackNibbles(data)[:SECTION_BLOCKS]
+    else:
+        metas = npy.zeros(SECTION_BLOCKS, dtype=npy.uint8)
+    return ids, metas
@@ -0,0 +1,66 @@
+# Shared volume module: numpy block volumes in shared memory, for importing with several processes.
+# Doesn't need Blender.
+
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as npy
+
+
+def _releaseMemory(shm, owner):
+    try:
+        shm.close()
+    except BufferError:
+        pass    # an array over it is still alive somewhere in this process; unlinking below still frees the name
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedVolume:
+    """A numpy array (.array) whose memory is a named multiprocessing.shared_memory block, so other processes
+can attach to it from its handle and read or write it in place: nothing is pickled or copied between them.
+
+    vol = SharedVolume((size, 256, size), npy.uint16)   # creates the block; this process owns it
+    worker(vol.handle)  ->  SharedVolume.attach(handle).array[...] = ...
+
+The owner unlinks the block on release(), or failing that when the SharedVolume is garbage collected or
+the interpreter exits, so a cancelled or failed import doesn't leave it behind. Attached ones only close."""
+
+    def __init__(self, shape, dtype, name=None):
+        dtype = npy.dtype(dtype)
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.owner = name is None
+        if self.owner:
+            size = max(1, int(npy.prod(self.shape)) * dtype.itemsize)
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.array = npy.ndarray(self.shape, dtype=dtype, buffer=self._shm.buf)
+        if self.owner:
+            self.array.fill(0)
+        self._finalizer = weakref.finalize(self, _releaseMemory, self._shm, self.owner)
+
+    def attach(handle):
+        """The SharedVolume for a handle another process got from .handle."""
+        name, shape, dtype = handle
+        return SharedVolume(shape, dtype, name)
+
+    @property
+    def handle(self):
+        """(name, shape, dtype): all a process needs to attach to this volume. Picklable."""
+        return (self._shm.name, self.shape, self.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        """Drops this process's array and mapping (and unlinks the block, if this is the owner)."""
+        self.array = None
+        self._finalizer()
@@ -0,0 +1,149 @@
+# World index module: which chunks of a world (dimension) exist, from its region file headers alone.
+# Doesn't need Blender.
+
+import os
+import re
+import zipfile
+
+import numpy as npy
+
+from . import regionfile
+
+_REGIONNAME = re.compile(r"^r\.(-?\d+)\.(-?\d+)\.(mca|mcr)$")
+_ZBIAS = 1 << 31  # chunk z plus this is never negative, so keys sort by x, then z
+
+
+def chunkKeys(chunkX, chunkZ):
+    """Sortable int64 keys for chunk coords (numbers or arrays): ordered by x, then z."""
+    return npy.asarray(chunkX, dtype=npy.int64) * (1 << 32) + (npy.asarray(chunkZ, dtype=npy.int64) + _ZBIAS)
+
+
+def _keyCoords(keys):
+    chunkX = keys >> 32
+    return npy.stack((chunkX, (keys - (chunkX << 32)) - _ZBIAS), axis=-1)
+
+
+def _scanRegion(fileName, regionX, regionZ):
+    """Keys of the generated chunks of one region file, read from the locations half of its header."""
+    with open(fileName, 'rb') as rfile:
+        locations = rfile.read(regionfile.SECTOR_BYTES)
+    if len(locations) < regionfile.SECTOR_BYTES:
+        return npy.zeros(0, dtype=npy.int64)  # new, empty region file
+    present = npy.flatnonzero(npy.frombuffer(locations, dtype='>u4'))
+    return chunkKeys(regionX * 32 + (present & 31), regionZ * 32 + (present >> 5))
+
+
+class WorldIndex:
+    """The generated chunks of the region files in one folder, as a sorted array of chunk keys (see chunkKeys):
+built by reading just the first 4 kiB of each region file, and answering presence, bounding box and radius
+queries without touching the files again. Save it, and loading it again rescans only the region files
+whose modification time has changed (or that are new):
+
+    index = WorldIndex.load(regionDir, indexFile)   # or WorldIndex(regionDir).refresh()
+    index.save(indexFile)
+    chunks = index.chunksWithin(playerChunkX, playerChunkZ, 10)
+"""
+
+    def __init__(self, regionDir, ext="mca"):
+        self.regionDir = regionDir
+        self.ext = ext
+        self._regions = {}  # region file name -> (mtime in ns, chunk keys)
+        self.keys = npy.zeros(0, dtype=npy.int64)
+        self.rescanned = 0  # region files read by the last refresh
+
+    def refresh(self):
+        """Brings the index up to date with the region folder; returns self."""
+        seen = set()
+        self.rescanned = 0
+        for fileName in os.listdir(self.regionDir):
+            match = _REGIONNAME.match(fileName)
+            if match is None or match.group(3) != self.ext:
+                continue
+            seen.add(fileName)
+            mtime = os.stat(os.path.join(self.regionDir, fileName)).st_mtime_ns
+            known = self._regions.get(fileName)
+            if known is None or known[0] != mtime:
+                keys = _scanRegion(os.path.join(self.regionDir, fileName), int(match.group(1)), int(match.group(2)))
+                self._regions[fileName] = (mtime, keys)
+                self.rescanned += 1
+        for fileName in set(self._regions) - seen:  # deleted region files
+            del self._regions[fileName]
+        if self._regions:
+            self.keys = npy.sort(npy.concatenate([keys for mtime, keys in self._regions.values()]))
+        else:
+            self.keys = npy.zeros(0, dtype=npy.int64)
+        return self
+
+    def load(regionDir, indexFile, ext="mca"):
+        """A WorldIndex for regionDir from indexFile (as saved by save), brought up to date. If there's no
+usable indexFile (missing, truncated or otherwise unreadable), it's built from scratch."""
+        index = WorldIndex(regionDir, ext)
+        try:
+            with npy.load(indexFile) as saved:
+                names, mtimes, counts, keys = saved['names'], saved['mtimes'], saved['counts'], saved['keys']
+            starts = npy.concatenate(([0], npy.cumsum(counts)))
+            for i, fileName in enumerate(names):
+                index._regions[str(fileName)] = (int(mtimes[i]), keys[starts[i]:starts[i + 1]])
+        except (OSError, KeyError, ValueError, IndexError, EOFError, zipfile.BadZipFile):
+            index._regions = {}
+        return index.refresh()
+
+    def save(self, indexFile):
+        """Writes the index to indexFile: to a temporary file first, then moved over it, so a crash part way
+through leaves the old index (or none), never a truncated one."""
+        names = sorted(self._regions)
+        keys = [self._regions[fileName][1] for fileName in names]
+        tempFile = "%s.%d.tmp" % (indexFile, os.getpid())
+        try:
+            with open(tempFile, 'wb') as f:  # (npy.savez would add .npz to the name)
+                npy.savez(f, names=npy.array(names, dtype=str),
+                          mtimes=npy.array([self._regions[fileName][0] for fileName in names], dtype=npy.int64),
+                          counts=npy.array([len(k) for k in keys], dtype=npy.int64),
+                          keys=npy.concatenate(keys) if keys else npy.zeros(0, dtype=npy.int64))
+            os.replace(tempFile, indexFile)
+        except BaseException:
+            if os.path.exists(tempFile):
+                os.remove(tempFile)
+            raise
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, chunk):
+        key = chunkKeys(chunk[0], chunk[1])
+        i = npy.searchsorted(self.keys, key)
+        return bool(i < len(self.keys) and self.keys[i] == key)
+
+    def present(self, chunks):
+        """Those of chunks (x, z pairs) that exist, in the order given."""
+        if len(chunks) == 0 or len(self.keys) == 0:
+            return []
+        coords = npy.asarray(chunks, dtype=npy.int64)
+        keep = npy.isin(chunkKeys(coords[:, 0], coords[:, 1]), self.keys, assume_unique=True)
+        return [chunk for chunk, k in zip(chunks, keep) if k]
+
+    def bounds(self):
+        """(xMin, zMin, xMax, zMax) of the chunks there are, or None if there are none."""
+        if len(self.keys) == 0:
+            return None
+        coords = _keyCoords(self.keys)
+        return (int(coords[0, 0]), int(coords[:, 1].min()), int(coords[-1, 0]), int(coords[:, 1].max()))
+
+    def chunksIn(self, xMin, xMax, zMin=None, zMax=None):
+        """The chunks there are with x in xMin..xMax and (if given) z in zMin..zMax, all inclusive, as an (n, 2)
+array of x, z ordered by x then z. Each x row is a pair of binary searches."""
+        if zMin is None or zMax is None:
+            lo, hi = npy.searchsorted(self.keys, chunkKeys([xMin, xMax + 1], -_ZBIAS))
+            return _keyCoords(self.keys[lo:hi])
+        rows = npy.arange(xMin, xMax + 1)
+        los = npy.searchsorted(self.keys, chunkKeys(rows, zMin))
+        his = npy.searchsorted(self.keys, chunkKeys(rows, zMax), side='right')
+        if not (his > los).any():
+            return npy.zeros((0, 2), dtype=npy.int64)
+        return _keyCoords(npy.concatenate([self.keys[lo:hi] for lo, hi in zip(los, his) if hi > lo]))
+
+    def chunksWithin(self, chunkX, chunkZ, radius):
+        """The chunks there are whose centres are within radius chunks of chunk chunkX, chunkZ's (a disc)."""
+        coords = self.chunksIn(chunkX - radius, chunkX + radius, chunkZ - radius, chunkZ + radius)
+        offsets = coords - (chunkX, chunkZ)
+        return coords[(offsets * offsets).sum(axis=1) <= radius * radius]
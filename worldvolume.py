@@ -0,0 +1,150 @@
+# World volume module: the block ids and data values of the box of the world an import loads.
+# Doesn't need Blender.
+
+import numpy as npy
+
+from .sharedvolume import SharedVolume
+
+ID_DTYPE = npy.uint16  # ids are at most 12 bits (see blockregistry.BLOCK_ID_LIMIT)
+META_DTYPE = npy.uint8  # data values are 4 bits
+WORLD_HEIGHT = 256  # block rows in a chunk (Y 0-255)
+HALO = 1  # rows decoded beyond the import's Y limits, for the blocks at the limits to look at
+
+
+def _row(y, yOrigin):
+    row = y - yOrigin
+    if row < 0:
+        raise IndexError("height %d is below the volume (it starts at %d)" % (y, yOrigin))
+    return row
+
+
+class VolumeLayer:
+    """One of a WorldVolume's arrays, indexed in world heights: layer[x][y][z] (or layer[x, y, z]) is the block
+at volume x, world y, volume z. Heights the volume doesn't hold are an IndexError, not a wrap round."""
+
+    __slots__ = ('array', 'yOrigin')
+
+    def __init__(self, array, yOrigin):
+        self.array = array
+        self.yOrigin = yOrigin
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            x, y, z = key
+            return self.array[x, _row(y, self.yOrigin), z]
+        return VolumeLayer._Plane(self.array[key], self.yOrigin)
+
+    class _Plane:
+        __slots__ = ('array', 'yOrigin')
+
+        def __init__(self, array, yOrigin):
+            self.array = array
+            self.yOrigin = yOrigin
+
+        def __getitem__(self, y):
+            return self.array[_row(y, self.yOrigin)]
+
+
+class WorldVolume:
+    """Block ids (uint16) and data values (uint8) of an x, y, z box of blocks: 3 bytes a block, where a pair
+of float64 buffers takes 16. It needn't be the world's full height: row 0 of its arrays (.ids, .metas) is
+world height yOrigin (see forHeights). It indexes like the (blockBuffer, extraBuffer) pair it stands in for,
+in world heights, so volume[0][x][y][z] is a block's id and volume[1][x][y][z] its data value (blockBuffer,
+extraBuffer = volume works too: see VolumeLayer). That's convenient rather than quick: loops over many blocks
+should index .ids and .metas directly, at [x, y - yOrigin, z]. Decoded sections go in with putSection(s).
+
+With shared=True the arrays are in shared memory (see sharedvolume), so decode worker processes can attach
+to them from .handle and fill them in place:
+
+    volume = WorldVolume((size, 256, size), shared=True)
+    worker(volume.handle)  ->  WorldVolume.attach(handle).putSections(...)
+"""
+
+    def __init__(self, shape, shared=False, yOrigin=0):
+        self.shape = tuple(shape)
+        self.yOrigin = yOrigin
+        self.shared = None  # (ids, metas) SharedVolumes, if shared
+        if shared:
+            self._share(SharedVolume(self.shape, ID_DTYPE), SharedVolume(self.shape, META_DTYPE))
+        else:
+            self.ids = npy.zeros(self.shape, dtype=ID_DTYPE)
+            self.metas = npy.zeros(self.shape, dtype=META_DTYPE)
+        self._layers = None
+
+    def forHeights(sizeX, sizeZ, lowLimit, highLimit, shared=False, halo=HALO):
+        """A volume for importing heights lowLimit..highLimit (inclusive) of a sizeX by sizeZ area: just those
+rows, and halo more on each side (within the world) so the blocks at the limits can look at their neighbours.
+The chunk reader decodes HALO rows past the limits into it (see AnvilChunkReader._processBlocks)."""
+        yOrigin = min(max(lowLimit - halo, 0), WORLD_HEIGHT - 1)
+        yTop = max(min(highLimit + halo, WORLD_HEIGHT - 1), yOrigin)
+        return WorldVolume((sizeX, yTop - yOrigin + 1, sizeZ), shared, yOrigin)
+
+    def _share(self, idVolume, metaVolume):
+        self.shared = (idVolume, metaVolume)
+        self.ids = idVolume.array
+        self.metas = metaVolume.array
+        self._layers = None
+
+    def attach(handle):
+        """The WorldVolume for a handle another process got from .handle."""
+        idHandle, metaHandle, yOrigin = handle
+        idVolume = SharedVolume.attach(idHandle)
+        volume = WorldVolume.__new__(WorldVolume)
+        volume.shape = idVolume.shape
+        volume.yOrigin = yOrigin
+        volume._share(idVolume, SharedVolume.attach(metaHandle))
+        return volume
+
+    @property
+    def handle(self):
+        """What a process needs to attach to this volume (only if it's shared). Picklable."""
+        return (self.shared[0].handle, self.shared[1].handle, self.yOrigin)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.metas.nbytes
+
+    @property
+    def yTop(self):
+        """The world height of the volume's top row."""
+        return self.yOrigin + self.shape[1] - 1
+
+    def __getitem__(self, i):
+        if self._layers is None:
+            self._layers = (VolumeLayer(self.ids, self.yOrigin), VolumeLayer(self.metas, self.yOrigin))
+        return self._layers[i]
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        return iter((self[0], self[1]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        """Drops the arrays (and, if shared, this process's mapping of them: see SharedVolume.release)."""
+        self.ids = self.metas = self._layers = None
+        if self.shared is not None:
+            for volume in self.shared:
+                volume.release()
+
+    def putSection(self, baseX, baseZ, secY, ids, metas):
+        """Writes a section's (16,16,16) y,z,x ids and metas (see AnvilChunkReader.chunkSections) in at block
+baseX, world height secY, baseZ. Only the rows within the volume's heights are copied."""
+        low = max(secY, self.yOrigin)
+        high = min(secY + 16, self.yTop + 1)
+        if low >= high:
+            return
+        rows = slice(low - self.yOrigin, high - self.yOrigin)
+        self.ids[baseX:baseX + 16, rows, baseZ:baseZ + 16] = ids[low - secY:high - secY].transpose(2, 0, 1)
+        self.metas[baseX:baseX + 16, rows, baseZ:baseZ + 16] = metas[low - secY:high - secY].transpose(2, 0, 1)
+
+    def putSections(self, sections, baseX, baseZ):
+        """putSection for each of a chunk's (secY, ids, metas) sections."""
+        for secY, ids, metas in sections:
+            self.putSection(baseX, baseZ, secY, ids, metas)